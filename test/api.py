@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from flask import Flask, Response, g, jsonify, request
+from werkzeug.http import is_resource_modified
+from werkzeug.serving import make_server
+
+from boxscores import current_snapshot
+from correlation import prop_correlations, prop_parlay
+from defense import VARIANTS, defense_vs_position
+from gamelog_index import INDEX_STATS, PROP_STATS, get_index
+from ladder import line_ladder
+from metrics import prometheus_text, snapshot as metrics_snapshot, trace
+from names import get_resolver
+from slate import evaluate_prop, evaluate_slate
+from splits import SPLIT_DIMENSIONS, player_splits
+from snapshots import after_fork, pin
+
+# ================================
+# JSON HTTP API
+# ================================
+# Read-only endpoints over the same in-process index, rolling and defense
+# caches the Streamlit app uses. Every request is pinned to one snapshot, and
+# responses carry that snapshot's version as ETag (and its publish time as
+# Last-Modified), so pollers get a 304 until new games are ingested.
+#
+#   GET  /api/version
+#   GET  /api/players?q=plum
+#   GET  /api/players/<player>/games?last_n=10
+#   GET  /api/props?player=...&stat=points&line=15.5&over_under=over&opponent=Aces&minutes=30
+#   POST /api/props                  {"props": [{"player", "stat", "line", "over_under", "opponent"?, "minutes"?}, ...]}
+#   POST /api/correlations         {"props": [...]} same-game pair correlations and joint hit rates
+#   GET  /api/splits?player=...&stat=points&line=15.5&over_under=over&dimension=rest
+#   GET  /api/ladder?player=...&player=...&stat=points&opponent=Aces
+#   GET  /api/matchups?position=G&opponent=Aces&variant=per_36&last_n=10
+#   GET  /api/metrics                JSON latency histograms and cache hit rates (this worker)
+#   GET  /metrics                    the same in Prometheus text format
+#
+# Every response has a Server-Timing header with the request's span breakdown.
+
+DEFAULT_PORT = 8000
+# Live per-process state, never answered from the data version's ETag
+UNVERSIONED_ENDPOINTS = {"metrics", "prometheus_metrics"}
+
+app = Flask(__name__)
+
+
+def _records(df):
+    # NaN -> null and numpy scalars -> JSON numbers
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _last_modified(snapshot):
+    return datetime.fromtimestamp(snapshot.published_at(), tz=timezone.utc).replace(microsecond=0)
+
+
+def _last_n(default=None):
+    value = request.args.get("last_n")
+    if value is None:
+        return default
+    if not value.isdigit() or int(value) == 0:
+        raise ValueError(f"Invalid last_n: {value}")
+    return int(value)
+
+
+def _resolve(player):
+    resolver = get_resolver()
+    athlete_id = resolver.resolve(player)
+    if athlete_id is None or get_index().game_count(athlete_id) == 0:
+        return None, (jsonify(error=f"No data found for player: {player}", suggestions=resolver.suggest(player)), 404)
+    return athlete_id, None
+
+
+def _posted_props():
+    body = request.get_json(silent=True)
+    rows = body.get("props") if isinstance(body, dict) else body
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("Expected a JSON list of props or {\"props\": [...]}")
+    return pd.DataFrame(rows)
+
+
+def _versioned():
+    return request.method == "GET" and request.endpoint not in UNVERSIONED_ENDPOINTS
+
+
+@app.before_request
+def _pin_snapshot():
+    g.trace_context = trace(f"api {request.method} {request.url_rule.rule if request.url_rule else request.path}")
+    g.trace = g.trace_context.__enter__()
+    g.pin = pin(current_snapshot())
+    g.snapshot = g.pin.__enter__()
+    g.last_modified = _last_modified(g.snapshot)
+    if _versioned() and not is_resource_modified(
+            request.environ, etag=g.snapshot.version, last_modified=g.last_modified):
+        return Response(status=304)
+
+
+@app.after_request
+def _cache_headers(response):
+    if "trace" in g:
+        spans = [f"total;dur={(time.perf_counter() - g.trace.start) * 1000:.2f}"]
+        spans += [f'{row["span"]};dur={row["ms"]:.2f}' for row in g.trace.rows() if row["depth"] == 1]
+        response.headers["Server-Timing"] = ", ".join(spans)
+    if _versioned() and response.status_code in (200, 304):
+        response.set_etag(g.snapshot.version)
+        response.last_modified = g.last_modified
+        # Clients may keep responses but must revalidate them with the ETag
+        response.cache_control.no_cache = True
+    return response
+
+
+@app.teardown_request
+def _unpin_snapshot(_exc):
+    if "pin" in g:
+        g.pin.__exit__(None, None, None)
+    if "trace_context" in g:
+        g.trace_context.__exit__(None, None, None)
+
+
+@app.errorhandler(ValueError)
+def _bad_request(error):
+    return jsonify(error=str(error)), 400
+
+
+@app.get("/api/version")
+def version():
+    return jsonify(version=g.snapshot.version, last_modified=g.last_modified.isoformat())
+
+
+@app.get("/api/players")
+def players():
+    resolver = get_resolver()
+    query = request.args.get("q", "")
+    names = resolver.suggest(query) if query else sorted(resolver.names.values())
+    return jsonify(players=names)
+
+
+@app.get("/api/players/<player>/games")
+def player_games(player):
+    athlete_id, error = _resolve(player)
+    if error:
+        return error
+    index = get_index()
+    start, end = index.bounds(athlete_id)
+    last_n = _last_n()
+    if last_n is not None:
+        end = min(end, start + last_n)
+
+    games = pd.DataFrame({"game_date": index.dates[start:end]})
+    for stat in INDEX_STATS + [s for s in PROP_STATS if s not in INDEX_STATS]:
+        games[stat] = index.stats[stat][start:end]
+    return jsonify(athlete_id=athlete_id, player=index.player_names[athlete_id], games=_records(games))
+
+
+@app.route("/api/props", methods=["GET", "POST"])
+def props():
+    if request.method == "POST":
+        slate = evaluate_slate(_posted_props())
+        return jsonify(props=_records(slate))
+
+    missing = [col for col in ["player", "stat", "line"] if not request.args.get(col)]
+    if missing:
+        raise ValueError(f"Missing query parameters: {missing}")
+    athlete_id, error = _resolve(request.args["player"])
+    if error:
+        return error
+    line = request.args.get("line", type=float)
+    if line is None:
+        raise ValueError(f"Invalid line: {request.args['line']}")
+    over_under = request.args.get("over_under", "over").lower()
+    minutes = request.args.get("minutes", type=float)
+    return jsonify(evaluate_prop(athlete_id, request.args["stat"], line, over_under,
+                                 request.args.get("opponent"), minutes))
+
+
+@app.get("/api/splits")
+def splits():
+    missing = [col for col in ["player", "stat"] if not request.args.get(col)]
+    if missing:
+        raise ValueError(f"Missing query parameters: {missing}")
+    athlete_id, error = _resolve(request.args["player"])
+    if error:
+        return error
+    dimensions = request.args.getlist("dimension") or SPLIT_DIMENSIONS
+    unknown = [d for d in dimensions if d not in SPLIT_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Invalid dimension: {unknown}")
+    line = request.args.get("line", type=float)
+    over_under = request.args.get("over_under", "over").lower()
+    table = player_splits(athlete_id, request.args["stat"], line, over_under, dimensions)
+    return jsonify(athlete_id=athlete_id, stat=request.args["stat"], line=line, splits=_records(table))
+
+
+@app.get("/api/ladder")
+def ladder():
+    players = request.args.getlist("player")
+    if not players or not request.args.get("stat"):
+        raise ValueError("Missing query parameters: player and stat are required")
+    athlete_ids = []
+    for player in players:
+        athlete_id, error = _resolve(player)
+        if error:
+            return error
+        athlete_ids.append(athlete_id)
+    table = line_ladder(athlete_ids, request.args["stat"], request.args.get("opponent"))
+    return jsonify(stat=request.args["stat"], ladder=_records(table))
+
+
+@app.post("/api/correlations")
+def correlations():
+    props = _posted_props()
+    return jsonify(pairs=_records(prop_correlations(props)), parlay=prop_parlay(props))
+
+
+@app.get("/api/matchups")
+def matchups():
+    variant = request.args.get("variant", "per_game")
+    if variant not in VARIANTS:
+        raise ValueError(f"Invalid variant: {variant}")
+    table = defense_vs_position(variant, _last_n())
+    position = request.args.get("position")
+    if position:
+        table = table[table["position"] == position.upper()]
+    opponent = request.args.get("opponent")
+    if opponent:
+        table = table[table["opponent_team_name"].str.lower() == opponent.lower()]
+    return jsonify(variant=variant, last_n=_last_n(), matchups=_records(table))
+
+
+@app.get("/api/metrics")
+def metrics():
+    return jsonify(metrics_snapshot())
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(prometheus_text(), mimetype="text/plain; version=0.0.4")
+
+
+# ================================
+# Serving
+# ================================
+def warm_up():
+    # Build the shared caches once, before workers fork, so they start warm
+    with pin(current_snapshot()):
+        get_index().stat_matrix(PROP_STATS[0])
+        get_resolver()
+        defense_vs_position()
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=1):
+    # One threaded server per worker process, all accepting on one shared
+    # socket. Each worker keeps its own caches and follows new snapshots on
+    # its own, so they never need to coordinate.
+    warm_up()
+    if workers <= 1:
+        make_server(host, port, app, threaded=True).serve_forever()
+        return
+
+    sock = socket.create_server((host, port), reuse_port=False, backlog=128)
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            after_fork()
+            make_server(host, port, app, threaded=True, fd=sock.fileno()).serve_forever()
+            os._exit(0)
+        children.append(pid)
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve WNBA prop and matchup data as JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes sharing the port")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
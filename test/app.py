@@ -1,67 +1,61 @@
+import json
+
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sqlalchemy import create_engine, text
-from datetime import datetime, timedelta
-import time
 
-from playerstats import get_player_stats
 from bettingline import betting_line
-from r import install_and_load
+from refresher import get_refresher, is_stale, last_game_date
+from boxscores import current_snapshot, has_box_scores, load_latest_season
+from snapshots import pin
+from metrics import snapshot as metrics_snapshot, span, summary_rows, trace
+from gamelog_index import PROP_STATS
+from names import resolve_player, suggest_players
+from ladder import LADDER_STATS, line_ladder
+from splits import player_splits
+from defense import VARIANTS
+from matchups import POSITIONS, LOG_COLUMNS, MATCHUP_METRICS, MATCHUP_WINDOWS, team_names, matchups_by_position, last_10_game_logs
 
 import streamlit as st
 
-# Setup in-memory SQLite engine
-engine = create_engine('sqlite:///:memory:')
-
 st.set_page_config(page_title="WNBA Betting Lines", page_icon=":basketball:", layout="wide")
 
-# Load data
-df = pd.read_csv('wnbaboxscore.csv')
-
-bad_team_names = ["TEAM CLARK", "TEAM COLLIER"]
-df = pd.read_csv('wnbaboxscore.csv')
-
-
 #############################
 # Main execution
 #############################
 def check_data_freshness(df):
-    today = datetime.today().date()
-    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
-
-    if df.empty:
-        st.warning("⚠️ CSV is empty. Attempting to load fresh data...")
-        install_and_load()
-        bad_team_names = ["TEAM CLARK", "TEAM COLLIER"]
-        df = pd.read_csv('wnbaboxscore.csv')
-        df_clean = df[~df['opponent_team_name'].isin(bad_team_names)].copy()
-        df_clean.to_csv("wnba_box_scores_cleaned2.csv", index=False)
+    refresher = get_refresher()
+    status = refresher.status()
+
+    if status["state"] != "idle":
+        st.info("🔄 Refreshing data in the background. Showing the last loaded data until it finishes.")
+    elif df.empty:
+        st.warning("⚠️ CSV is empty. Loading fresh data in the background...")
+        refresher.request_refresh()
+    elif is_stale(df):
+        st.warning(f"📅 Data is outdated. Last game in CSV: {last_game_date(df)}")
+        if refresher.request_refresh():
+            st.info("🔄 Refreshing data in the background. Showing the last loaded data until it finishes.")
     else:
-        last_game_date = df["game_date"][0]
-        if last_game_date < yesterday:
-            st.warning(f"📅 Data is outdated. Last game in CSV: {last_game_date}")
-            install_and_load()
-            bad_team_names = ["TEAM CLARK", "TEAM COLLIER"]
-            df = pd.read_csv('wnbaboxscore.csv')
-            df_clean = df[~df['opponent_team_name'].isin(bad_team_names)].copy()
-            df_clean.to_csv("wnba_box_scores_cleaned2.csv", index=False)
+        st.success(f"✅ Data is up to date. Last game date: {last_game_date(df)}")
 
-        else:
-            st.success(f"✅ Data is up to date. Last game date: {last_game_date}")
+    if status["last_error"]:
+        st.error("❌ The last background refresh failed. Still serving the previous data.")
 
 def show_betting_line():
     st.title("📈 WNBA Betting Line Calculator")
 
-    player = st.text_input("Enter player name for betting line:")
-    stat = st.selectbox("Select stat:", ["points", "rebounds", "assists", "three_pointers_made", "three_points_percentage"])
+    query = st.text_input("Enter player name for betting line:")
+    matches = suggest_players(query) if query else []
+    player = st.selectbox("Matching players:", matches) if matches else query
+    stat = st.selectbox("Select stat:", PROP_STATS)
     line = st.number_input("Enter betting line (e.g., 15.5):", step=0.5)
     over_under = st.selectbox("Select over/under:", ["over", "under"])
+    opponent = st.selectbox("Opponent (adjusts the model probability):", ["Any"] + team_names())
 
     if st.button("Get Betting Line"):
         if player and line and over_under:
             try:
-                df_result, summary = betting_line(stat, player, line, over_under)
+                df_result, summary = betting_line(stat, player, line, over_under,
+                                                  None if opponent == "Any" else opponent, details=True)
                 st.subheader(f"📊 Game Log for {player}")
                 if df_result is not None and not df_result.empty:
                     st.dataframe(df_result.style.format({
@@ -70,6 +64,13 @@ def show_betting_line():
                     }))
                     st.subheader("📈 Summary")
                     st.code(summary, language="markdown")
+                    st.subheader("🧭 Splits")
+                    st.dataframe(player_splits(resolve_player(player), stat, line, over_under), hide_index=True)
+                    if stat in LADDER_STATS:
+                        st.subheader("🪜 Line Ladder")
+                        ladder = line_ladder([resolve_player(player)], stat, None if opponent == "Any" else opponent)
+                        st.dataframe(ladder[["line"] + [c for c in ladder.columns if "rate" in c or c.startswith(("model", "fair"))]],
+                                     hide_index=True)
                 else:
                     st.warning(summary)
             except ValueError as e:
@@ -78,68 +79,38 @@ def show_betting_line():
             st.error("❌ Please fill all fields.")
 
 def show_matchups():
-    df = pd.read_csv('wnbaboxscore.csv')
-    df['game_date'] = pd.to_datetime(df['game_date'])
-
-    df = df[~df['team_name'].isin(['Team Clark', 'Team Collier'])]
-
-
     st.title("🏀 WNBA Opponent Matchup Analysis by Player Position")
     st.markdown(
         """
-        This analysis shows average Minutes, Points, Assists, Rebounds, and 3PM per position
-        against opposing teams. 'Games Sampled' indicates the number of games contributing to these averages.
+        This analysis shows what each opposing team allows per position, per game,
+        per 36 minutes or per 100 possessions. 'Games Sampled' indicates the number of games contributing to these averages.
         """
     )
 
-    team_name = st.sidebar.selectbox("Select Team", sorted(df["team_name"].unique()))
-    position = st.sidebar.selectbox("Select Position", ["G", "F", "C"])
-
-    matchups = df.groupby(["opponent_team_name", "athlete_position_abbreviation"]).agg({
-        "points": "mean",
-        "assists": "mean",
-        "rebounds": "mean",
-        "three_point_field_goals_made": "mean",
-        "minutes": "mean",
-        "athlete_display_name": "count"
-    }).rename(columns={"athlete_display_name": "games_sampled"}).reset_index()
-
-    matchups_by_pos = {
-        "G": matchups[matchups["athlete_position_abbreviation"] == "G"],
-        "F": matchups[matchups["athlete_position_abbreviation"] == "F"],
-        "C": matchups[matchups["athlete_position_abbreviation"] == "C"]
-    }
-
-    for metric in ["points", "assists", "rebounds", "three_point_field_goals_made"]:
+    team_name = st.sidebar.selectbox("Select Team", team_names())
+    position = st.sidebar.selectbox("Select Position", POSITIONS)
+    variant = st.sidebar.selectbox("Normalize", list(VARIANTS), format_func=VARIANTS.get)
+    window = st.sidebar.selectbox("Opponent games", list(MATCHUP_WINDOWS))
+
+    matchups_by_pos = matchups_by_position(variant, MATCHUP_WINDOWS[window])
+
+    for metric in MATCHUP_METRICS:
         st.header(f"### {metric.upper()} by Opponent and Position")
-        for pos in ["G", "F", "C"]:
+        for pos in POSITIONS:
             st.subheader(f"{pos} ({metric.upper()})")
-            df_metric = matchups_by_pos[pos].sort_values(by=metric, ascending=False)
-            st.dataframe(df_metric[["opponent_team_name", metric, "minutes", "games_sampled"]])
+            with span("render.matchup_table"):
+                df_metric = matchups_by_pos[pos].sort_values(by=metric, ascending=False)
+                st.dataframe(df_metric[["opponent_team_name", metric, "minutes", "team_games", "games_sampled"]])
 
     st.markdown("---")
 
-    filtered_df = df[(df["team_name"] == team_name) & (df["athlete_position_abbreviation"] == position)]
-    filtered_df_sorted = filtered_df.sort_values(["athlete_display_name", "game_date"], ascending=[True, False])
-
-    def last_10_games_only(player_df):
-        return player_df.head(10)
-
-    last_10_games = filtered_df_sorted.groupby("athlete_display_name").apply(last_10_games_only).reset_index(drop=True)
+    last_10_games = last_10_game_logs(team_name, position)
 
     st.header(f"📊 Last 10 Games per Player for {team_name} ({position})")
 
-    for player, group in last_10_games.groupby("athlete_display_name"):
+    for player, group in last_10_games.groupby("athlete_display_name", observed=True):
         with st.expander(f"{player} - Game Logs"):
-            group = group.copy()
-            group['PTS+REB+AST'] = group['points'] + group['rebounds'] + group['assists']
-            group['PTS+AST'] = group['points'] + group['assists']
-            group['PTS+REB'] = group['points'] + group['rebounds']
-            group['REB+AST'] = group['rebounds'] + group['assists']
-
-            display_cols = ['game_date', 'opponent_team_name', 'minutes', 'points', 'rebounds', 'assists',
-                            'three_point_field_goals_made', 'PTS+REB+AST', 'PTS+AST', 'PTS+REB', 'REB+AST']
-            st.dataframe(group[display_cols])
+            st.dataframe(group[LOG_COLUMNS])
 
             avg_stats = {
                 "Minutes": group['minutes'].mean(),
@@ -156,10 +127,29 @@ def show_matchups():
             st.markdown("#### Averages over Last 10 Games")
             st.json(avg_stats)
 
+def show_debug_panel(page_trace):
+    # Hidden: only rendered with ?debug=1 in the URL
+    with st.expander("🛠 Debug: timings and cache hit rates", expanded=True):
+        st.markdown(f"**This run:** {page_trace.duration * 1000:.1f} ms")
+        st.dataframe(pd.DataFrame(page_trace.rows()), hide_index=True)
+
+        spans, caches = summary_rows()
+        st.markdown("**Since process start**")
+        st.dataframe(pd.DataFrame(spans), hide_index=True)
+        st.dataframe(pd.DataFrame(caches), hide_index=True)
+
+        refresh_trace = get_refresher().status()["last_trace"]
+        if refresh_trace is not None:
+            st.markdown("**Last background refresh**")
+            st.code(refresh_trace.report())
+
+        st.download_button("Download metrics (JSON)", json.dumps(metrics_snapshot(), indent=2),
+                           file_name="wnba_metrics.json", mime="application/json")
+
 def interactive_prompt():
     st.title("🏀 WNBA Betting Lines and Player Stats")
 
-    check_data_freshness(df)
+    check_data_freshness(load_latest_season())
 
     option = st.radio("Choose a section to explore:", ["🏀 Betting Line Calculator", "📊 Matchup Stats by Position"])
 
@@ -170,5 +160,16 @@ def interactive_prompt():
         show_matchups()
 
 if __name__ == "__main__":
-    interactive_prompt()
+    # Background refresh: also re-checks for stale data every hour
+    get_refresher().start(interval_seconds=60 * 60)
+    if not has_box_scores():
+        st.warning("⚠️ No box scores yet. Loading them in the background, check back in a few minutes...")
+        get_refresher().request_refresh()
+        st.stop()
+
+    # Render the whole page from one data version, even if a refresh publishes mid-run
+    with pin(current_snapshot()), trace("page") as page_trace:
+        interactive_prompt()
     st.write("✅ Thank you for using the WNBA Betting Lines app!")
+    if st.query_params.get("debug") == "1":
+        show_debug_panel(page_trace)
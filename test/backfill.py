@@ -0,0 +1,133 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from boxscores import DATA_DIR, apply_types, dimension_rows, merge_dimensions, read_box_score_csv, replace_box_scores, scan_franchises
+from ingest import SOURCES, get_source
+from metrics import span, timed
+
+# ================================
+# Parallel multi-season backfill
+# ================================
+# Rebuilds the store from many seasons at once. Each season is fetched (or its
+# saved partitions re-parsed) in its own worker process and split into
+# per-(season, season_type) partition files under partitions/. The latest
+# season is always fetched again, since it may still be in progress. Workers also
+# build each partition's compact frame, dimension tables and database rows, so
+# the parent only concatenates them and publishes one snapshot.
+#
+#   python backfill.py --first 2003 --last 2025
+#   python backfill.py --first 2003 --source dump --path wnba_player_box.parquet --workers 8
+
+PARTITION_DIR = os.path.join(DATA_DIR, "partitions")
+
+
+def partition_path(season, season_type):
+    return os.path.join(PARTITION_DIR, f"{season}-{season_type}.csv")
+
+
+def partition_key(path):
+    # (season, season_type) of a partition file
+    season, season_type = os.path.basename(path)[:-len(".csv")].split("-")
+    return int(season), int(season_type)
+
+
+def season_partitions(season):
+    return sorted(glob.glob(os.path.join(PARTITION_DIR, f"{season}-*.csv")))
+
+
+def write_partitions(rows):
+    # One raw CSV per (season, season_type), each written atomically
+    os.makedirs(PARTITION_DIR, exist_ok=True)
+    paths = []
+    for (season, season_type), part in rows.groupby(["season", "season_type"]):
+        path = partition_path(season, season_type)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        part.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+def build_partition(path, franchises):
+    # None when no row survives cleaning, e.g. a preseason-only partition.
+    # franchises: of the whole season (see boxscores.franchise_keys)
+    from db import table_rows
+
+    raw = read_box_score_csv(path, franchises=franchises)
+    if raw.empty:
+        return None
+    df = apply_types(raw)
+    return {
+        "key": partition_key(path),
+        "path": path,
+        "df": df,
+        "dimensions": dimension_rows(raw),
+        "tables": table_rows(df),
+    }
+
+
+def backfill_season(source, season, refetch=False):
+    # Runs in a worker process. Partitions already on disk are reused unless refetch is set.
+    paths = season_partitions(season)
+    if refetch or not paths:
+        paths = write_partitions(source.fetch_season(season))
+    franchises = scan_franchises(paths)
+    partitions = [build_partition(path, franchises) for path in paths]
+    return [partition for partition in partitions if partition is not None]
+
+
+def merge_partitions(partitions):
+    from db import merge_table_rows
+
+    partitions = sorted(partitions, key=lambda p: p["key"])
+    df = apply_types(pd.concat([p["df"] for p in partitions], ignore_index=True))
+    dimensions = merge_dimensions([p["dimensions"] for p in partitions])
+    tables = merge_table_rows([p["tables"] for p in partitions])
+    return [p["path"] for p in partitions], df, dimensions, tables
+
+
+@timed("backfill.run")
+def backfill(seasons, source=None, workers=None, refetch=False):
+    source = source or get_source()
+    latest = max(seasons)
+    partitions = []
+    # spawn, not fork: the wehoop source embeds an R session per worker
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context) as pool:
+        futures = {pool.submit(backfill_season, source, season, refetch or season == latest): season
+                   for season in seasons}
+        for future in as_completed(futures):
+            built = future.result()
+            partitions.extend(built)
+            print(f"Season {futures[future]}: {sum(len(p['df']) for p in built)} rows "
+                  f"in {len(built)} partition(s)")
+
+    if not partitions:
+        raise ValueError(f"No box scores found for seasons {min(seasons)}-{max(seasons)}")
+    with span("backfill.merge"):
+        paths, df, dimensions, tables = merge_partitions(partitions)
+    snapshot = replace_box_scores(paths, df, dimensions, tables)
+    print(f"Published snapshot {snapshot.version}: {len(df)} rows from {len(paths)} partitions.")
+    return snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the WNBA box score store from many seasons in parallel")
+    parser.add_argument("--first", type=int, required=True, help="First season to load")
+    parser.add_argument("--last", type=int, default=datetime.today().year, help="Last season to load")
+    parser.add_argument("--source", choices=sorted(SOURCES), default=None)
+    parser.add_argument("--path", default=None, help="File (dump) or directory (fixture) to read")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--refetch", action="store_true", help="Fetch every season again, not only the latest")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    backfill(range(args.first, args.last + 1), get_source(args.source, args.path), args.workers, args.refetch)
+    print(f"Backfill finished in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# ================================
+# Benchmark suite
+# ================================
+# Times the main data paths on synthetic data of growing size (see
+# synthetic.py). Every size runs in a fresh interpreter against its own
+# scratch store (WNBA_DATA_DIR), so timings include cold caches and the real
+# data in this directory is never touched. Results are written as JSON (under
+# benchmarks/ by default); --compare prints the change against an earlier
+# results file.
+#
+#   python benchmark.py --seasons 1 3 10 --output before.json
+#   python benchmark.py --seasons 1 3 10 --compare before.json
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(DATA_DIR, "benchmarks")
+BOX_SCORE_FILE = "wnbaboxscore.csv"
+HELD_OUT_FILE = "held_out.csv"
+DEFAULT_SEASONS = [1, 3, 10]
+DEFAULT_LOOKUPS = 200
+SLATE_STATS = ["points", "rebounds", "assists", "three_pointers_made", "PTS+REB+AST"]
+# Slower by more than this factor counts as a regression in --compare
+REGRESSION_RATIO = 1.2
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=DATA_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ================================
+# One size, inside a scratch store
+# ================================
+def run_benchmarks(lookups=DEFAULT_LOOKUPS, seed=0):
+    # Must run with WNBA_DATA_DIR set: every module below reads the store from there
+    from bettingline import betting_line
+    from correlation import CorrelationEngine
+    from boxscores import build_cache, read_box_score_csv
+    from gamelog_index import get_index
+    from ladder import line_ladder
+    from matchups import last_10_game_logs, matchups_by_position, team_names
+    from names import get_resolver
+    from probability import MODEL_STATS, get_distributions, prop_probabilities
+    from refresh import apply_new_games
+    from rolling import get_rolling
+    from slate import evaluate_slate
+    from splits import SplitCube, player_splits
+    from snapshots import Snapshot
+
+    rng = np.random.default_rng(seed)
+    timings = {}
+
+    df, timings["csv_load"] = _timed(read_box_score_csv)
+    snapshot, timings["snapshot_build"] = _timed(build_cache)
+    _, timings["snapshot_load"] = _timed(Snapshot(snapshot.version).frame)
+    index, timings["index_build"] = _timed(get_index)
+    _, timings["name_index_build"] = _timed(get_resolver)
+
+    players = [index.player_names[a] for a in index.athlete_ids]
+    picks = rng.choice(len(players), lookups)
+    stats = rng.choice(SLATE_STATS, lookups)
+    lines = rng.integers(0, 30, lookups) + 0.5
+
+    keys = [(int(a), stat, None, None) for a in index.athlete_ids for stat in MODEL_STATS]
+    _, timings["model_simulate"] = _timed(get_distributions, keys)
+    model_stats = rng.choice(MODEL_STATS, lookups)
+    _, seconds = _timed(prop_probabilities, index.athlete_ids[picks], model_stats, lines, ["over"] * lookups)
+    timings["model_price_per_line"] = seconds / lookups
+    _, timings["ladder_all_players"] = _timed(line_ladder, index.athlete_ids, "points")
+
+    lookup_times = []
+    for i, stat, line in zip(picks, stats, lines):
+        _, seconds = _timed(betting_line, stat, players[i], line, "over")
+        lookup_times.append(seconds)
+    timings["betting_line_mean"] = float(np.mean(lookup_times))
+    timings["betting_line_p95"] = float(np.percentile(lookup_times, 95))
+
+    resolver = get_resolver()
+    typos = [name[:-1] if len(name) > 4 else name for name in np.array(players)[picks]]
+    _, seconds = _timed(lambda: [resolver.resolve(name) for name in typos])
+    timings["name_resolve_mean"] = seconds / lookups
+
+    _, timings["matchups"] = _timed(matchups_by_position)
+    _, timings["matchups_per_36_last_10"] = _timed(matchups_by_position, "per_36", 10)
+    team = team_names()[0]
+    _, timings["matchups_last_10_logs"] = _timed(last_10_game_logs, team, "G")
+
+    props = pd.DataFrame([
+        {"player": player, "stat": stat, "line": 10.5, "over_under": "over"}
+        for player in players for stat in SLATE_STATS
+    ])
+    _, timings["slate"] = _timed(evaluate_slate, props)
+    _, timings["rolling_summary"] = _timed(get_rolling().summary)
+    _, timings["splits_build"] = _timed(SplitCube, Snapshot(snapshot.version).frame())
+    _, seconds = _timed(lambda: [player_splits(int(index.athlete_ids[i]), stat, line)
+                                 for i, stat, line in zip(picks, stats, lines)])
+    timings["splits_query_mean"] = seconds / lookups
+    engine, timings["correlation_build"] = _timed(CorrelationEngine, Snapshot(snapshot.version).frame())
+    legs = [(int(index.athlete_ids[i]), stat, line, "over") for i, stat, line in zip(picks, stats, lines)]
+    _, timings["correlation_pairs"] = _timed(engine.pairs, legs)
+
+    held_out = pd.read_csv(os.path.join(os.environ["WNBA_DATA_DIR"], HELD_OUT_FILE))
+    _, timings["incremental_ingest"] = _timed(apply_new_games, held_out)
+
+    return {
+        "rows": len(df),
+        "players": len(players),
+        "slate_props": len(props),
+        "incremental_rows": len(held_out),
+        "timings": timings,
+    }
+
+
+def benchmark_size(seasons, teams, players_per_team, games_per_team, playoffs, lookups, seed):
+    from synthetic import generate_box_scores
+
+    data_dir = tempfile.mkdtemp(prefix="wnba-bench-")
+    try:
+        df, generate_seconds = _timed(generate_box_scores, seasons, teams, players_per_team, games_per_team,
+                                      playoffs=playoffs, seed=seed)
+        # The last game day is held back and ingested incrementally at the end
+        last_day = df["game_date"] == df["game_date"].max()
+        df[~last_day].to_csv(os.path.join(data_dir, BOX_SCORE_FILE), index=False)
+        df[last_day].to_csv(os.path.join(data_dir, HELD_OUT_FILE), index=False)
+
+        env = dict(os.environ, WNBA_DATA_DIR=data_dir)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", "--lookups", str(lookups), "--seed", str(seed)],
+            cwd=DATA_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark run failed for {seasons} season(s):\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    result.update(seasons=seasons, teams=teams, players_per_team=players_per_team,
+                  games_per_team=games_per_team, playoffs=playoffs)
+    result["timings"]["generate"] = generate_seconds
+    return result
+
+
+# ================================
+# Reporting
+# ================================
+def _run_key(run):
+    return run["seasons"], run["teams"], run["players_per_team"], run["games_per_team"], run["playoffs"]
+
+
+def print_results(results):
+    for run in results["runs"]:
+        print(f"\n{run['seasons']} season(s), {run['rows']} rows, {run['players']} players")
+        for name, seconds in run["timings"].items():
+            print(f"  {name:<28} {seconds * 1000:>10.2f} ms")
+
+
+def compare_results(results, baseline):
+    baseline_runs = {_run_key(run): run for run in baseline["runs"]}
+    regressions = 0
+    print(f"\nCompared with {baseline.get('commit', '?')} (ratio = new / old)")
+    for run in results["runs"]:
+        old = baseline_runs.get(_run_key(run))
+        if old is None:
+            continue
+        print(f"\n{run['seasons']} season(s), {run['rows']} rows")
+        for name, seconds in run["timings"].items():
+            if name not in old["timings"] or old["timings"][name] == 0:
+                continue
+            ratio = seconds / old["timings"][name]
+            flag = "  <-- slower" if ratio > REGRESSION_RATIO else ""
+            regressions += ratio > REGRESSION_RATIO
+            print(f"  {name:<28} {old['timings'][name] * 1000:>10.2f} -> {seconds * 1000:>10.2f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the WNBA data paths on synthetic box scores")
+    parser.add_argument("--seasons", type=int, nargs="+", default=DEFAULT_SEASONS)
+    parser.add_argument("--teams", type=int, default=13)
+    parser.add_argument("--players-per-team", type=int, default=12)
+    parser.add_argument("--games-per-team", type=int, default=40)
+    parser.add_argument("--no-playoffs", action="store_true")
+    parser.add_argument("--lookups", type=int, default=DEFAULT_LOOKUPS, help="betting_line calls to time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/benchmark-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_benchmarks(args.lookups, args.seed)))
+        sys.exit(0)
+
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [],
+    }
+    for seasons in args.seasons:
+        print(f"Benchmarking {seasons} season(s)...")
+        results["runs"].append(benchmark_size(seasons, args.teams, args.players_per_team, args.games_per_team,
+                                              not args.no_playoffs, args.lookups, args.seed))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"benchmark-{commit}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f))
+        sys.exit(1 if regressions else 0)
@@ -1,109 +1,88 @@
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sqlalchemy import create_engine, text, inspect # Import inspect
-import time
-
-# Create a persistent SQLite engine
-# The database file 'wnba.db' will be created in the same directory as this script
-engine = create_engine('sqlite:///wnba.db')
-
-# Use the inspector to check if the tables already exist
-inspector = inspect(engine)
-
-# Only create and populate tables if they don't exist
-# This prevents recreating the tables every time the script is run or imported
-if not inspector.has_table('wnbaplayers') or not inspector.has_table('games'):
-    print("Creating and populating database tables...")
-
-    # ================================
-    # Load player data into wnbaplayers
-    # ================================
-    df_players = pd.read_csv('wnbaboxscore.csv')
-    df_players["team_full_name"] = df_players["team_location"] + " " + df_players["team_name"]
-    df_players = df_players[["athlete_id", "athlete_display_name", "team_full_name"]].drop_duplicates()
-    df_players = df_players.rename(columns={
-        "athlete_id": "id",
-        "athlete_display_name": "player_name",
-        "team_full_name": "team_name"
-    })
-    df_players = df_players[~df_players["team_name"].isin(["TEAM CLARK", "TEAM COLLIER"])]
-
-    df_players.to_sql(name='wnbaplayers', con=engine, if_exists='replace', index=False)
-
-    # ================================
-    # Load game data into games table
-    # ================================
-    df_games = pd.read_csv('wnbaboxscore.csv')
-    df_games["three_points_percentage"] = df_games["three_point_field_goals_made"] / df_games["three_point_field_goals_attempted"]
-    df_games = df_games[[
-        "athlete_id", "game_date", "minutes", "points", "rebounds", "assists",
-        "three_point_field_goals_made", "three_points_percentage"
-    ]].drop_duplicates()
-    df_games = df_games.rename(columns={
-        "athlete_id": "id",
-        "three_point_field_goals_made": "three_pointers_made"
-    })
-    df_games = df_games[~df_games["game_date"].isin(["2025-07-19"])]
-    df_games.to_sql(name='games', con=engine, if_exists='replace', index=False)
-    
-    print("Database tables created successfully.")
-else:
-    print("Database tables already exist. Skipping creation.")
+import numpy as np
+
+from boxscores import current_snapshot
+from gamelog_index import PROP_STATS, get_index
+from metrics import timed
+from names import get_resolver
+from probability import MODEL_STATS, SIMULATIONS, prop_probabilities, resolve_opponent
+from snapshots import pin
+from splits import SPLIT_DIMENSIONS, get_splits, split_label
 
 # ================================
 # Function: betting_line
 # ================================
-def betting_line(stat, player=None, line=None, over_under=None):
-    allowed_stats = {"points", "rebounds", "assists"}
-    if stat not in allowed_stats:
+def _mean(values):
+    # Same as pandas .mean(): skip DNP (NaN) games, NaN when nothing was played
+    played = values[~np.isnan(values)]
+    return played.mean() if len(played) else float("nan")
+
+
+def no_player_message(player):
+    message = f"No data found for player: {player}"
+    suggestions = get_resolver().suggest(player, 3)
+    if suggestions:
+        message += f". Did you mean: {', '.join(suggestions)}?"
+    return message
+
+
+@timed("betting_line")
+def betting_line(stat, player=None, line=None, over_under=None, opponent=None, details=False):
+    # details: also the situational splits and the model probability, which
+    # cost milliseconds rather than microseconds
+    if stat not in PROP_STATS:
         raise ValueError(f"Invalid stat: {stat}")
-    
-    query_str = f"""
-        SELECT p.player_name, g.game_date, g.minutes, g.{stat}
-        FROM wnbaplayers p 
-        JOIN games g ON p.id = g.id
-        WHERE p.player_name = :player
-          AND p.team_name NOT IN ('Team Collier TEAM COLLIER', 'Team Clark TEAM CLARK')
-        ORDER BY g.game_date DESC
-    """
-
-    with engine.connect() as conn:
-        query = conn.execute(text(query_str), {"player": player})
-        df = pd.DataFrame(query.fetchall(), columns=query.keys())
-
-    if df.empty:
-        return None, f"No data found for player: {player}"
-
-    games_played = len(df)
-    last_5_games = df.head(5)
-    last_10_games = df.head(10)
+    # Every lookup below reads the same snapshot, resolved once
+    with pin(current_snapshot()):
+        return _betting_line(stat, player, line, over_under, opponent, details)
+
+
+def _betting_line(stat, player, line, over_under, opponent, details):
+    index = get_index()
+    resolver = get_resolver()
+    athlete_id = resolver.resolve(player)
+    if athlete_id is None or index.game_count(athlete_id) == 0:
+        return None, no_player_message(player)
+    player = index.player_names[athlete_id]
+
+    df = index.game_log(athlete_id, stat)
+    values = index.values(athlete_id, stat)
+
+    games_played = len(values)
+    last_10_values = values[:10]
 
     result = []
     result.append(f"Total games played by {player}: {games_played}")
-    result.append(f"Averaging {stat} per game: {df[stat].mean():.2f}")
-    result.append(f"In the last 10 games, averaging {stat} per game: {last_10_games[stat].mean():.2f}")
-
-    if line is not None:
-        total_games = len(df)
-
-        if over_under == "over":
-            over_5 = (last_5_games[stat] > line).sum()
-            over_10 = (last_10_games[stat] > line).sum()
-            over_all = (df[stat] > line).sum()
-            result.append(f"\n{player} has gone OVER {line} {stat}:")
-            result.append(f" - In the last 5 games: {over_5} out of 5 games ({(over_5 / 5) * 100:.1f}%)")
-            result.append(f" - In the last 10 games: {over_10} out of 10 games ({(over_10 / 10) * 100:.1f}%)")
-            result.append(f" - Across all {total_games} games: {over_all} out of {total_games} ({(over_all / total_games) * 100:.1f}%)")
-
-        elif over_under == "under":
-            under_5 = (last_5_games[stat] < line).sum()
-            under_10 = (last_10_games[stat] < line).sum()
-            under_all = (df[stat] < line).sum()
-            result.append(f"\n{player} has gone UNDER {line} {stat}:")
-            result.append(f" - In the last 5 games: {under_5} out of 5 games ({(under_5 / 5) * 100:.1f}%)")
-            result.append(f" - In the last 10 games: {under_10} out of 10 games ({(under_10 / 10) * 100:.1f}%)")
-            result.append(f" - Across all {total_games} games: {under_all} out of {total_games} ({(under_all / total_games) * 100:.1f}%)")
+    result.append(f"Averaging {stat} per game: {_mean(values):.2f}")
+    result.append(f"In the last 10 games, averaging {stat} per game: {_mean(last_10_values):.2f}")
+
+    if line is not None and over_under in ("over", "under"):
+        count = index.count_over if over_under == "over" else index.count_under
+        result.append(f"\n{player} has gone {over_under.upper()} {line} {stat}:")
+        # Windows at least as long as the player's history would just repeat the all-games line
+        for window in [w for w in (5, 10) if w < games_played]:
+            hits = count(athlete_id, stat, line, window)
+            result.append(f" - In the last {window} games: {hits} out of {window} games ({hits / window * 100:.1f}%)")
+        hits = count(athlete_id, stat, line)
+        result.append(f" - Across all {games_played} games: {hits} out of {games_played} ({hits / games_played * 100:.1f}%)")
+
+    if details and line is not None and over_under in ("over", "under"):
+        # Situational splits; the opponent one only for the given opponent
+        opponent = resolve_opponent(opponent)
+        result.append("\nBy situation:")
+        for dimension, value, hits, games in get_splits().hit_counts(athlete_id, stat, line, over_under, SPLIT_DIMENSIONS):
+            if dimension == "opponent" and value != opponent:
+                continue
+            label = split_label(dimension, value)
+            result.append(f" - {label[0].upper()}{label[1:]}: {hits} out of {games} games ({hits / games * 100:.1f}%)")
+
+        if stat in MODEL_STATS:
+            model = prop_probabilities([athlete_id], [stat], [line], [over_under], [opponent])
+            prob, push, odds = (float(model[col][0]) for col in ("prob", "push", "fair_odds"))
+            if not np.isnan(prob):
+                versus = f" vs {opponent}" if opponent else ""
+                result.append(f"\nModel ({SIMULATIONS:,} simulations{versus}): {prob * 100:.1f}% {over_under.upper()}"
+                              + (f", {push * 100:.1f}% push" if push else "")
+                              + (f", fair odds {odds:+.0f}" if not np.isnan(odds) else ""))
 
     return df, "\n".join(result)
 
@@ -0,0 +1,372 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow.csv as pacsv
+
+import snapshots
+from metrics import cache_result, timed
+
+# ================================
+# Shared box score store
+# ================================
+# The raw CSV is parsed once and published as a versioned snapshot (typed
+# Feather file + SQLite tables, see snapshots.py). Later loads memory-map the
+# current snapshot instead of re-parsing the CSV. A new snapshot is built only
+# when the CSV's mtime/size changes AND its content hash no longer matches the
+# one recorded in the snapshot pointer.
+
+# WNBA_DATA_DIR points the store somewhere else (benchmarks, scratch copies)
+DATA_DIR = os.environ.get("WNBA_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+BOX_SCORE_CSV = os.path.join(DATA_DIR, "wnbaboxscore.csv")
+
+# ================================
+# Compact in-memory model
+# ================================
+# The CSV has 57 columns, most of them display metadata (URLs, logos, colors,
+# slugs) repeated on every row. The snapshot frame keeps only the columns the
+# analytics read, with dictionary-encoded strings and small integer stats.
+# Team and player metadata go to dimension tables with one row per team_id /
+# athlete_id (the most recent values), joined only for display.
+
+ID_COLUMNS = {
+    "game_id": "int32", "season": "int16", "season_type": "int8", "athlete_id": "int32",
+    "team_id": "int32", "opponent_team_id": "int32", "team_score": "int16", "opponent_team_score": "int16",
+}
+CATEGORICAL_COLUMNS = [
+    "athlete_display_name", "athlete_position_abbreviation", "team_name", "team_location",
+    "opponent_team_name", "home_away",
+]
+FLAG_COLUMNS = ["starter", "did_not_play", "team_winner"]
+# Null on did-not-play rows, hence nullable integers
+STAT_COLUMNS = [
+    "minutes", "field_goals_made", "field_goals_attempted", "three_point_field_goals_made",
+    "three_point_field_goals_attempted", "free_throws_made", "free_throws_attempted", "offensive_rebounds",
+    "defensive_rebounds", "rebounds", "assists", "steals", "blocks", "turnovers", "fouls", "points",
+]
+BOX_SCORE_COLUMNS = ["game_date"] + list(ID_COLUMNS) + CATEGORICAL_COLUMNS + FLAG_COLUMNS + STAT_COLUMNS
+COLUMN_DTYPES = dict(ID_COLUMNS, **{col: "category" for col in CATEGORICAL_COLUMNS},
+                     **{col: "bool" for col in FLAG_COLUMNS}, **{col: "Int16" for col in STAT_COLUMNS})
+
+DIMENSIONS = {
+    "teams": ("team_id", [
+        "team_id", "team_name", "team_location", "team_display_name", "team_short_display_name",
+        "team_abbreviation", "team_slug", "team_uid", "team_logo", "team_color", "team_alternate_color",
+    ]),
+    "players": ("athlete_id", [
+        "athlete_id", "athlete_display_name", "athlete_short_name", "athlete_jersey", "athlete_headshot_href",
+        "athlete_position_name", "athlete_position_abbreviation",
+    ]),
+}
+CSV_COLUMNS = sorted(set(BOX_SCORE_COLUMNS).union(*(cols for _, cols in DIMENSIONS.values())))
+
+# ================================
+# Streaming reads
+# ================================
+# Every reader of the CSV goes through iter_box_score_csv(): rows are parsed
+# CHUNK_ROWS at a time, exhibition games are dropped and each (game_id,
+# athlete_id) is kept once (the first one), so the snapshot, the database
+# tables, exports and backfill partitions all see the same rows.
+#
+# ESPN files All-Star games as regular season games, under teams made up for
+# the one game (TEAM CLARK vs TEAM COLLIER). A league franchise faces several
+# opponents over a season, so a team is one in a season when it faced at least
+# LEAGUE_MIN_OPPONENTS different opponents that season or the season before
+# (which covers a season's first games). A game in which neither team is a
+# franchise is an exhibition. The schedule only tells franchises apart once
+# there is enough of it: a season whose previous season is not in the data and
+# in which some team has not faced LEAGUE_MIN_OPPONENTS yet (its opening days,
+# say) counts all of its teams as franchises, leaving its exhibitions to
+# season_type and EXHIBITION_TEAM_IDS. The franchises come from a first pass
+# over four columns of the file, or from the stored rows when appending.
+
+CHUNK_ROWS = 50_000
+# Regular season and postseason
+LEAGUE_SEASON_TYPES = [2, 3]
+LEAGUE_MIN_OPPONENTS = 2
+# Teams whose games are always exhibitions, whatever their schedule
+EXHIBITION_TEAM_IDS = [131246, 131247]
+
+# Serializes snapshot builds and appends within the process
+_store_lock = threading.RLock()
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _csv_pointer(csv_path, content_hash=None):
+    stat = os.stat(csv_path)
+    content_hash = content_hash or _file_hash(csv_path)
+    return {
+        "version": f"{content_hash[:16]}-{snapshots.FORMAT_VERSION}",
+        "csv_path": os.path.abspath(csv_path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": content_hash,
+    }
+
+
+def apply_types(df):
+    # Raw box score rows -> the compact analytic frame
+    df = df[BOX_SCORE_COLUMNS].copy()
+    df["game_date"] = pd.to_datetime(df["game_date"])
+    return df.astype(COLUMN_DTYPES)
+
+
+def merge_dimensions(parts):
+    # Dimension tables of several batches of rows, oldest first -> one row per id
+    return {
+        name: pd.concat([part[name] for part in parts], ignore_index=True)
+        .drop_duplicates(key, keep="last").sort_values(key).reset_index(drop=True)
+        for name, (key, _) in DIMENSIONS.items()
+    }
+
+
+def dimension_rows(df, previous=None):
+    # {name: one row per id} from raw rows, on top of the previous tables
+    df = df.sort_values("game_date", kind="stable")
+    dimensions = {name: df[columns] for name, (_, columns) in DIMENSIONS.items()}
+    return merge_dimensions([previous, dimensions] if previous is not None else [dimensions])
+
+
+def latest_rows(df):
+    # The rows dimension_rows() takes some id's values from. dimension_rows() of
+    # these rows from every chunk, in file order, equals it on all the rows.
+    df = df.sort_values("game_date", kind="stable")
+    latest = np.zeros(len(df), dtype=bool)
+    for key, _ in DIMENSIONS.values():
+        latest |= ~df[key].duplicated(keep="last").to_numpy()
+    return df[latest]
+
+
+def season_matchups(rows, matchups=None):
+    # (season, team_id, opponent_team_id) of the rows' league games, added to `matchups`
+    matchups = set() if matchups is None else matchups
+    league = rows.loc[rows["season_type"].isin(LEAGUE_SEASON_TYPES), ["season", "team_id", "opponent_team_id"]]
+    matchups.update(league.drop_duplicates().astype("int64").itertuples(index=False, name=None))
+    return matchups
+
+
+def franchise_keys(matchups):
+    # season << 32 | team_id of every (season, league franchise) pair
+    opponents = Counter((season, team) for season, team, _ in matchups)
+    seasons = {season for season, _ in opponents}
+    # Seasons with too little schedule to judge (see above)
+    unjudged = {season for (season, _), count in opponents.items()
+                if count < LEAGUE_MIN_OPPONENTS and season - 1 not in seasons}
+    keys = set()
+    for (season, team), count in opponents.items():
+        if count >= LEAGUE_MIN_OPPONENTS:
+            keys.update((season << 32 | team, (season + 1) << 32 | team))
+        elif season in unjudged:
+            keys.add(season << 32 | team)
+    return np.array(sorted(keys), dtype="int64")
+
+
+@timed("data.scan_franchises")
+def scan_franchises(csv_paths):
+    # franchise_keys() of whole CSV files. Arrow's streaming reader only
+    # converts the four columns read, unlike pandas' usecols.
+    options = pacsv.ConvertOptions(include_columns=["season", "season_type", "team_id", "opponent_team_id"])
+    matchups = set()
+    for path in csv_paths:
+        for batch in pacsv.open_csv(path, convert_options=options):
+            season_matchups(batch.to_pandas(), matchups)
+    return franchise_keys(matchups)
+
+
+def is_exhibition(rows, franchises):
+    season = rows["season"].to_numpy(dtype="int64") << 32
+    league = (np.isin(season | rows["team_id"].to_numpy(dtype="int64"), franchises)
+              | np.isin(season | rows["opponent_team_id"].to_numpy(dtype="int64"), franchises))
+    return (~rows["season_type"].isin(LEAGUE_SEASON_TYPES).to_numpy() | ~league
+            | rows["team_id"].isin(EXHIBITION_TEAM_IDS).to_numpy()
+            | rows["opponent_team_id"].isin(EXHIBITION_TEAM_IDS).to_numpy())
+
+
+def row_keys(rows):
+    # (game_id, athlete_id) packed into one int64
+    return (rows["game_id"].to_numpy(dtype="int64") << 32) | rows["athlete_id"].to_numpy(dtype="int64")
+
+
+def clean_rows(rows, seen, franchises):
+    # Rows without exhibition games (see franchise_keys) or any (game_id,
+    # athlete_id) in `seen`, whose keys are added to it
+    rows = rows[~is_exhibition(rows, franchises)]
+    keep = np.zeros(len(rows), dtype=bool)
+    for i, key in enumerate(row_keys(rows).tolist()):
+        if key not in seen:
+            seen.add(key)
+            keep[i] = True
+    return rows[keep]
+
+
+def iter_box_score_csv(csv_path=BOX_SCORE_CSV, columns=CSV_COLUMNS, chunk_rows=CHUNK_ROWS, franchises=None):
+    # Clean raw rows, at most chunk_rows at a time (columns=None reads all).
+    # franchises: franchise_keys() to use instead of the file's own.
+    if franchises is None:
+        franchises = scan_franchises([csv_path])
+    seen = set()
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunk_rows):
+        yield clean_rows(chunk, seen, franchises)
+
+
+@timed("data.csv_parse")
+def read_box_score_csv(csv_path=BOX_SCORE_CSV, columns=CSV_COLUMNS, franchises=None):
+    return pd.concat(iter_box_score_csv(csv_path, columns, franchises=franchises), ignore_index=True)
+
+
+@timed("data.snapshot_build")
+def build_cache(csv_path=BOX_SCORE_CSV, content_hash=None):
+    # Only one raw chunk is held at a time; the rest is kept as compact frames
+    frames, latest = [], []
+    for chunk in iter_box_score_csv(csv_path):
+        frames.append(apply_types(chunk))
+        latest.append(latest_rows(chunk))
+    df = apply_types(pd.concat(frames, ignore_index=True))
+    dimensions = dimension_rows(pd.concat(latest, ignore_index=True))
+    return snapshots.publish(df, _csv_pointer(csv_path, content_hash), dimensions=dimensions)
+
+
+def cache_is_current(csv_path=BOX_SCORE_CSV):
+    # The snapshot pointer when it matches the CSV, else None
+    pointer = snapshots.read_pointer()
+    if pointer is None or not os.path.isdir(snapshots.get_snapshot(pointer["version"]).path):
+        return None
+    if pointer.get("csv_path") != os.path.abspath(csv_path):
+        return None
+    if not pointer["version"].endswith(snapshots.FORMAT_VERSION):
+        return None
+
+    stat = os.stat(csv_path)
+    if pointer["mtime_ns"] == stat.st_mtime_ns and pointer["size"] == stat.st_size:
+        return pointer
+
+    # mtime moved (e.g. a re-download of identical data): trust the content hash
+    content_hash = _file_hash(csv_path)
+    if pointer["sha256"] == content_hash:
+        pointer = _csv_pointer(csv_path, content_hash)
+        snapshots.write_pointer(pointer)
+        return pointer
+    return None
+
+
+def has_box_scores(csv_path=BOX_SCORE_CSV):
+    return os.path.exists(csv_path)
+
+
+def current_snapshot(csv_path=BOX_SCORE_CSV):
+    # A pinned snapshot (see snapshots.pin) wins over newer data on disk
+    pinned = snapshots.pinned_snapshot()
+    if pinned is not None:
+        return pinned
+    with _store_lock:
+        pointer = cache_is_current(csv_path)
+        cache_result("snapshot", pointer is not None)
+        if pointer is None:
+            return build_cache(csv_path)
+        return snapshots.get_snapshot(pointer["version"])
+
+
+def data_version(csv_path=BOX_SCORE_CSV):
+    return current_snapshot(csv_path).version
+
+
+def load_box_scores(csv_path=BOX_SCORE_CSV, seasons=None):
+    # seasons: only read those seasons' partitions
+    return current_snapshot(csv_path).frame(seasons)
+
+
+def load_latest_season(csv_path=BOX_SCORE_CSV):
+    snapshot = current_snapshot(csv_path)
+    return snapshot.frame(snapshot.seasons()[-1:])
+
+
+def load_teams(csv_path=BOX_SCORE_CSV):
+    return current_snapshot(csv_path).dimension("teams")
+
+
+def load_players(csv_path=BOX_SCORE_CSV):
+    return current_snapshot(csv_path).dimension("players")
+
+
+def write_box_scores(rows, csv_path=BOX_SCORE_CSV):
+    # Replace the whole store; readers never see a half-written CSV
+    with _store_lock:
+        tmp_path = csv_path + ".tmp"
+        rows.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, csv_path)
+        return load_box_scores(csv_path)
+
+
+def replace_box_scores(partition_paths, df, dimensions, tables, csv_path=BOX_SCORE_CSV):
+    # Replace the whole store with partitions that were parsed and aggregated
+    # elsewhere (see backfill.py): the CSV is the partition files' rows in
+    # order, the snapshot is published from the prebuilt frame and tables.
+    with _store_lock:
+        tmp_path = csv_path + ".tmp"
+        headers = set()
+        for path in partition_paths:
+            with open(path) as f:
+                headers.add(f.readline())
+        if len(headers) == 1:
+            # Same columns everywhere: concatenate the files without parsing them
+            with open(tmp_path, "w") as out:
+                out.write(headers.pop())
+                for path in partition_paths:
+                    with open(path) as f:
+                        f.readline()
+                        shutil.copyfileobj(f, out)
+        else:
+            pd.concat([pd.read_csv(path) for path in partition_paths], ignore_index=True).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, csv_path)
+        return snapshots.publish(df, _csv_pointer(csv_path), dimensions=dimensions, tables=tables)
+
+
+# ================================
+# Incremental append
+# ================================
+@timed("data.append")
+def append_box_scores(new_rows, csv_path=BOX_SCORE_CSV):
+    # Appends clean rows whose (game_id, athlete_id) is not stored yet and publishes
+    # a new snapshot, without re-parsing the existing CSV. Returns the typed
+    # rows that were actually added, the version they were added to and the
+    # version published (the same one when nothing was added).
+    with _store_lock:
+        snapshot = current_snapshot(csv_path)
+        existing = snapshot.frame()
+
+        franchises = franchise_keys(season_matchups(new_rows, season_matchups(existing)))
+        new_rows = clean_rows(new_rows, set(row_keys(existing).tolist()), franchises)
+        if new_rows.empty:
+            return existing.iloc[0:0], snapshot.version, snapshot.version
+
+        # Append to a copy and swap it in, so other processes never hash a half-written file
+        new_rows = new_rows[list(pd.read_csv(csv_path, nrows=0).columns)]
+        tmp_path = csv_path + ".tmp"
+        shutil.copyfile(csv_path, tmp_path)
+        new_rows.to_csv(tmp_path, mode="a", header=False, index=False)
+        os.replace(tmp_path, csv_path)
+
+        added = apply_types(new_rows.copy())
+        combined = apply_types(pd.concat([existing, added], ignore_index=True))
+        dimensions = dimension_rows(new_rows, {name: snapshot.dimension(name) for name in DIMENSIONS})
+        published = snapshots.publish(combined, _csv_pointer(csv_path), added=added, dimensions=dimensions)
+        return added, snapshot.version, published.version
+
+
+def latest_stored_game(csv_path=BOX_SCORE_CSV):
+    df = load_latest_season(csv_path)
+    if df.empty:
+        return None
+    latest = df.loc[df["game_date"].idxmax()]
+    return {"game_id": int(latest["game_id"]), "game_date": latest["game_date"], "season": int(df["season"].max())}
@@ -0,0 +1,197 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from boxscores import data_version, load_box_scores
+from gamelog_index import PROP_STATS
+from metrics import cache_result, span, timed
+from names import get_resolver
+from slate import read_props
+from splits import stat_values
+
+# ================================
+# Same-game prop correlations
+# ================================
+# Players x games stat matrices aligned on game_id, plus a side matrix (+1
+# home, -1 away, 0 not in the game). A prop leg is one player's row, so the
+# sums behind pairwise correlations and joint hit rates for every pair of legs
+# are matrix products over their games. Two players were teammates in a game
+# when their sides multiply to +1 and opponents when they multiply to -1,
+# which splits every product into teammate and opponent games without another
+# pass. Each pair is measured over the games that match its current relation
+# (from each player's latest team), and only games both players played count.
+#
+#   python correlation.py props.csv
+
+# Fewer shared games than this leave the correlation undefined
+MIN_CORRELATION_GAMES = 3
+LEG_COLUMNS = ["athlete_id", "stat", "line", "over_under"]
+# Slates whose pair tables are kept per data version
+PAIR_CACHE_SLATES = 256
+PAIR_MEASURES = ["relation", "games", "correlation", "hit_rate_a", "hit_rate_b", "joint_hit_rate", "lift"]
+
+_cached = {"version": None, "engine": None}
+
+
+def _relation_sums(a, b, side, teammates):
+    # sum over games of a[i] * b[j], over games where legs i and j were on the
+    # same team (teammates[i, j]) or on opposing teams
+    total = a @ b.T
+    signed = (a * side) @ (b * side).T
+    return np.where(teammates, total + signed, total - signed) / 2
+
+
+class CorrelationEngine:
+    def __init__(self, df, version=None):
+        self.version = version
+        df = df.sort_values("game_date", kind="stable")
+        self.athlete_ids, rows = np.unique(df["athlete_id"].to_numpy(), return_inverse=True)
+        self.game_ids, cols = np.unique(df["game_id"].to_numpy(), return_inverse=True)
+        self._position = {int(a): i for i, a in enumerate(self.athlete_ids)}
+        self._cells = (rows, cols)
+        shape = (len(self.athlete_ids), len(self.game_ids))
+
+        self.side = np.zeros(shape, dtype="int8")
+        self.side[rows, cols] = np.where(df["home_away"] == "home", 1, -1)
+        # Team of each player's latest game (rows are in date order)
+        latest = ~pd.Series(rows).duplicated(keep="last").to_numpy()
+        self.teams = np.zeros(len(self.athlete_ids), dtype="int64")
+        self.teams[rows[latest]] = df["team_id"].to_numpy()[latest]
+        self._values = stat_values(df)
+        self._matrices = {}
+        self._pairs = {}
+
+    def stat_matrix(self, stat):
+        # players x games, NaN where the player did not play the game
+        if stat not in self._matrices:
+            matrix = np.full(self.side.shape, np.nan)
+            matrix[self._cells] = self._values[stat]
+            self._matrices[stat] = matrix
+        return self._matrices[stat]
+
+    def _normalize(self, legs):
+        legs = [(int(a), stat, float(line), side) for a, stat, line, side in legs]
+        unknown = sorted({a for a, _, _, _ in legs if a not in self._position})
+        if unknown:
+            raise ValueError(f"Unknown athlete_id: {unknown}")
+        bad_stats = {stat for _, stat, _, _ in legs} - set(PROP_STATS)
+        if bad_stats:
+            raise ValueError(f"Invalid stat: {sorted(bad_stats)}")
+        bad_sides = {side for _, _, _, side in legs} - {"over", "under"}
+        if bad_sides:
+            raise ValueError(f"Invalid over/under: {sorted(bad_sides)}")
+        return legs
+
+    def _legs(self, legs):
+        # Value, played and hit rows of each leg over the games any of them played
+        rows = np.array([self._position[a] for a, _, _, _ in legs], dtype="int64")
+        values = np.full((len(legs), len(self.game_ids)), np.nan)
+        for i, (row, (_, stat, _, _)) in enumerate(zip(rows, legs)):
+            values[i] = self.stat_matrix(stat)[row]
+        played = ~np.isnan(values)
+        games = np.flatnonzero(played.any(axis=0))
+        values, played = values[:, games], played[:, games]
+        lines = np.array([line for _, _, line, _ in legs])[:, None]
+        over = np.array([side == "over" for _, _, _, side in legs])[:, None]
+        hits = played & np.where(over, values > lines, values < lines)
+        side = self.side[rows][:, games].astype("float64")
+        return rows, np.where(played, values, 0.0), played.astype("float64"), hits.astype("float64"), side
+
+    def compute(self, legs):
+        # {measure: legs x legs matrix} for every pair of legs
+        rows, x, played, hits, side = self._legs(legs)
+        teammates = self.teams[rows][:, None] == self.teams[rows][None, :]
+        games = _relation_sums(played, played, side, teammates)
+        sum_x = _relation_sums(x, played, side, teammates)
+        sum_xx = _relation_sums(x * x, played, side, teammates)
+        sum_xy = _relation_sums(x, x, side, teammates)
+        hits_a = _relation_sums(hits, played, side, teammates)
+        joint = _relation_sums(hits, hits, side, teammates)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sum_xy - sum_x * sum_x.T / games
+            var = sum_xx - sum_x * sum_x / games
+            correlation = cov / np.sqrt(var * var.T)
+            rate = hits_a / games
+            joint_rate = joint / games
+            lift = joint_rate / (rate * rate.T)
+        correlation[games < MIN_CORRELATION_GAMES] = np.nan
+        relation = np.where(rows[:, None] == rows[None, :], "same player",
+                            np.where(teammates, "teammates", "opponents"))
+        return {"relation": relation, "games": games, "correlation": correlation, "hit_rate_a": rate,
+                "hit_rate_b": rate.T, "joint_hit_rate": joint_rate, "lift": lift}
+
+    def pairs(self, legs):
+        # One row per unordered pair of (athlete_id, stat, line, over_under) legs.
+        # Tables are cached per slate for the engine's data version.
+        legs = self._normalize(legs)
+        key = tuple(legs)
+        cache_result("correlation.pairs", key in self._pairs)
+        if key not in self._pairs:
+            measures = self.compute(legs)
+            first, second = np.triu_indices(len(legs), k=1)
+            frame = pd.DataFrame(legs, columns=LEG_COLUMNS)
+            table = pd.concat([
+                frame.iloc[first].add_suffix("_a").reset_index(drop=True),
+                frame.iloc[second].add_suffix("_b").reset_index(drop=True),
+                pd.DataFrame({name: measures[name][first, second] for name in PAIR_MEASURES}),
+            ], axis=1).astype({"games": "int64"})
+            if len(self._pairs) >= PAIR_CACHE_SLATES:
+                self._pairs.pop(next(iter(self._pairs)))
+            self._pairs[key] = table
+        return self._pairs[key].copy()
+
+    def parlay_hit_rate(self, legs):
+        # (hits, games) over the games every leg's player played: all legs hit in `hits` of them
+        _, _, played, hits, _ = self._legs(self._normalize(legs))
+        games = played.all(axis=0)
+        return int(hits.all(axis=0).sum()), int(games.sum())
+
+
+def get_correlations():
+    version = data_version()
+    cache_result("correlation", _cached["version"] == version)
+    if _cached["version"] != version:
+        df = load_box_scores()
+        with span("correlation.build"):
+            _cached["engine"] = CorrelationEngine(df, version)
+        _cached["version"] = version
+    return _cached["engine"]
+
+
+def prop_legs(props):
+    # (athlete_id, stat, line, over_under) legs from a slate of props (see slate.read_props)
+    df = read_props(props)
+    resolver = get_resolver()
+    athlete_ids = [resolver.resolve(p) for p in df["player"]]
+    unknown = [p for p, a in zip(df["player"], athlete_ids) if a is None]
+    if unknown:
+        raise ValueError(f"Unknown players: {unknown}")
+    return list(zip(athlete_ids, df["stat"], df["line"], df["over_under"]))
+
+
+@timed("prop_correlations")
+def prop_correlations(props):
+    # Pairwise table for a slate of props, with player names
+    table = get_correlations().pairs(prop_legs(props))
+    resolver = get_resolver()
+    for side in ("a", "b"):
+        table.insert(table.columns.get_loc(f"athlete_id_{side}") + 1, f"player_{side}",
+                     [resolver.name(a) for a in table[f"athlete_id_{side}"]])
+    return table
+
+
+def prop_parlay(props):
+    # How often every prop of the slate hit together, over the games all its players played
+    legs = prop_legs(props)
+    hits, games = get_correlations().parlay_hit_rate(legs)
+    return {"legs": len(legs), "hits": hits, "games": games, "hit_rate": hits / games if games else None}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python correlation.py props.csv")
+        sys.exit(1)
+    print(prop_correlations(sys.argv[1]).to_string(index=False))
+    print(prop_parlay(sys.argv[1]))
@@ -0,0 +1,302 @@
+from urllib.parse import quote
+
+import pandas as pd
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, create_engine, event, func, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import QueuePool
+
+from boxscores import current_snapshot
+from metrics import timed
+
+# ================================
+# Shared data access: schema, engines and queries
+# ================================
+# Every snapshot (see snapshots.py) carries one SQLite file with this schema.
+# Writers only ever touch a snapshot while it is being built; afterwards the
+# file is opened through a pooled, query-only engine shared by all sessions.
+
+POOL_SIZE = 8
+MAX_OVERFLOW = 8
+GAME_STATS = ["minutes", "points", "rebounds", "assists", "three_pointers_made", "three_points_percentage"]
+DEFENSE_STATS = ["points", "rebounds", "assists", "three_point_field_goals_made", "steals", "blocks", "turnovers"]
+# Running sums kept per (opponent, position); *_games are counts
+DEFENSE_SUMS = ["team_games", "player_games", "possessions", "minutes"] + DEFENSE_STATS
+
+metadata = MetaData()
+
+players = Table(
+    "players", metadata,
+    Column("athlete_id", Integer, primary_key=True),
+    Column("player_name", String, nullable=False, index=True),
+    Column("team_name", String),
+)
+
+games = Table(
+    "games", metadata,
+    Column("athlete_id", Integer, primary_key=True),
+    Column("game_id", Integer, primary_key=True),
+    # ISO yyyy-mm-dd, so text order is date order
+    Column("game_date", String(10), nullable=False, index=True),
+    Column("team_name", String),
+    Column("opponent_team_name", String),
+    *[Column(stat, Float) for stat in GAME_STATS],
+    Index("ix_games_athlete_date", "athlete_id", "game_date"),
+)
+
+# What each opponent allowed to each position in one game
+defense_games = Table(
+    "defense_games", metadata,
+    Column("opponent_team_name", String, primary_key=True),
+    Column("position", String, primary_key=True),
+    Column("game_id", Integer, primary_key=True),
+    Column("game_date", String(10), nullable=False),
+    *[Column(name, Float, nullable=False) for name in DEFENSE_SUMS],
+    Index("ix_defense_games_recent", "opponent_team_name", "position", "game_date"),
+)
+
+# Running totals of defense_games, incremented as games are ingested
+defense_totals = Table(
+    "defense_totals", metadata,
+    Column("opponent_team_name", String, primary_key=True),
+    Column("position", String, primary_key=True),
+    *[Column(name, Float, nullable=False) for name in DEFENSE_SUMS],
+)
+
+
+# ================================
+# Engines
+# ================================
+def _set_pragmas(*pragmas):
+    def on_connect(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return on_connect
+
+
+def create_writer_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", _set_pragmas("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"))
+    return engine
+
+
+def close_writer_engine(engine):
+    # Checkpoint the WAL into the file and leave it in rollback journal mode,
+    # so the published file is complete on its own
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode = DELETE")
+    engine.dispose()
+
+
+def create_reader_engine(path):
+    # Snapshots are immutable: opened read-only with immutable=1, readers take
+    # no locks and never create -wal/-shm files next to the database
+    engine = create_engine(
+        f"sqlite:///file:{quote(path)}?mode=ro&immutable=1&uri=true",
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", _set_pragmas("PRAGMA query_only = ON", "PRAGMA mmap_size = 268435456"))
+    return engine
+
+
+def get_engine():
+    # Pooled engine of the current (or pinned) snapshot
+    return current_snapshot().engine()
+
+
+# ================================
+# Building and updating tables
+# ================================
+def games_rows(df):
+    rows = df[[
+        "athlete_id", "game_id", "game_date", "team_name", "opponent_team_name", "minutes", "points",
+        "rebounds", "assists", "three_point_field_goals_made", "three_point_field_goals_attempted"
+    ]].copy()
+    rows["game_date"] = rows["game_date"].dt.strftime("%Y-%m-%d")
+    rows["team_name"] = rows["team_name"].astype(str)
+    rows["opponent_team_name"] = rows["opponent_team_name"].astype(str)
+    rows["three_points_percentage"] = rows["three_point_field_goals_made"] / rows["three_point_field_goals_attempted"]
+    rows = rows.rename(columns={"three_point_field_goals_made": "three_pointers_made"})
+    rows = rows.drop(columns=["three_point_field_goals_attempted"])
+    return rows.astype(object).where(rows.notna(), None)
+
+
+def players_rows(df):
+    # One row per athlete: name and team from their most recent game
+    rows = df[["athlete_id", "athlete_display_name", "team_location", "team_name", "game_date"]]
+    rows = rows.sort_values("game_date").drop_duplicates("athlete_id", keep="last")
+    return pd.DataFrame({
+        "athlete_id": rows["athlete_id"],
+        "player_name": rows["athlete_display_name"],
+        "team_name": rows["team_location"].astype(str) + " " + rows["team_name"].astype(str),
+    })
+
+
+def defense_rows(df):
+    # One row per (opponent, position, game) with the sums of that game.
+    # Possessions are the opposing team's estimate for the whole game
+    # (FGA - OREB + TOV + 0.44 * FTA), counted once per position row.
+    keys = ["opponent_team_name", "game_id"]
+
+    team = df[keys].astype({"opponent_team_name": str})
+    team["possessions"] = (
+        df["field_goals_attempted"].fillna(0) - df["offensive_rebounds"].fillna(0)
+        + df["turnovers"].fillna(0) + 0.44 * df["free_throws_attempted"].fillna(0)
+    )
+    possessions = team.groupby(keys)["possessions"].sum()
+
+    played = df[df["minutes"].notna() & df["athlete_position_abbreviation"].notna()]
+    rows = played[["minutes"] + DEFENSE_STATS].fillna(0)
+    rows["opponent_team_name"] = played["opponent_team_name"].astype(str)
+    rows["game_id"] = played["game_id"]
+    rows["position"] = played["athlete_position_abbreviation"].astype(str)
+    rows["game_date"] = played["game_date"].dt.strftime("%Y-%m-%d")
+    rows["player_games"] = 1.0
+
+    rows = rows.groupby(keys + ["position"]).agg(
+        game_date=("game_date", "max"), player_games=("player_games", "sum"),
+        **{name: (name, "sum") for name in ["minutes"] + DEFENSE_STATS},
+    ).reset_index()
+    rows["team_games"] = 1.0
+    rows["possessions"] = possessions.reindex(pd.MultiIndex.from_frame(rows[keys])).to_numpy()
+    return rows[[c.name for c in defense_games.columns]]
+
+
+def defense_totals_rows(rows):
+    return rows.groupby(["opponent_team_name", "position"])[DEFENSE_SUMS].sum().reset_index()
+
+
+def table_rows(df):
+    # Rows for every table from new box score rows
+    defense = defense_rows(df)
+    return {
+        "players": players_rows(df),
+        "games": games_rows(df),
+        "defense_games": defense,
+        "defense_totals": defense_totals_rows(defense),
+    }
+
+
+def merge_table_rows(parts):
+    # table_rows() of partitions (oldest first, no game in two partitions) -> the rows of all of them
+    rows = {name: pd.concat([part[name] for part in parts], ignore_index=True) for name in parts[0]}
+    rows["players"] = rows["players"].drop_duplicates("athlete_id", keep="last")
+    rows["defense_totals"] = defense_totals_rows(rows["defense_totals"])
+    return rows
+
+
+def _upsert(conn, table, rows):
+    if rows.empty:
+        return
+    stmt = sqlite_insert(table)
+    keys = [c.name for c in table.primary_key.columns]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name not in keys},
+    )
+    conn.execute(stmt, rows.to_dict("records"))
+
+
+def _increment(conn, table, rows):
+    # Adds the rows' sums onto whatever is stored under the same key
+    if rows.empty:
+        return
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key.columns],
+        set_={name: table.c[name] + stmt.excluded[name] for name in DEFENSE_SUMS},
+    )
+    conn.execute(stmt, rows.to_dict("records"))
+
+
+@timed("db.create_tables")
+def create_tables(engine, df, rows=None):
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    upsert_tables(engine, df, rows)
+
+
+@timed("db.upsert_tables")
+def upsert_tables(engine, df, rows=None):
+    # players/games are upserted; the defense sums are incremented, so `df`
+    # must only hold rows that are not stored yet. `rows` may be passed
+    # prebuilt (see table_rows) instead of being derived from `df`.
+    rows = rows or table_rows(df)
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        _upsert(conn, players, rows["players"])
+        _upsert(conn, games, rows["games"])
+        _increment(conn, defense_games, rows["defense_games"])
+        _increment(conn, defense_totals, rows["defense_totals"])
+
+
+# ================================
+# Queries
+# ================================
+@timed("db.read_games")
+def read_games():
+    # Every game row, grouped by athlete and most recent first (served by ix_games_athlete_date)
+    query = (
+        select(games.c.athlete_id, players.c.player_name.label("athlete_display_name"), games.c.game_date,
+               *[games.c[stat] for stat in GAME_STATS])
+        .join(players, players.c.athlete_id == games.c.athlete_id)
+        .order_by(games.c.athlete_id, games.c.game_date.desc())
+    )
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn)
+
+
+@timed("db.read_defense")
+def read_defense(last_n=None):
+    # Sums per (opponent, position): the running totals, or only each
+    # opponent's most recent last_n games
+    if last_n is None:
+        query = select(defense_totals)
+    else:
+        recent = select(
+            defense_games,
+            func.row_number().over(
+                partition_by=[defense_games.c.opponent_team_name, defense_games.c.position],
+                order_by=defense_games.c.game_date.desc(),
+            ).label("game_rank"),
+        ).subquery()
+        query = (
+            select(recent.c.opponent_team_name, recent.c.position,
+                   *[func.sum(recent.c[name]).label(name) for name in DEFENSE_SUMS])
+            .where(recent.c.game_rank <= last_n)
+            .group_by(recent.c.opponent_team_name, recent.c.position)
+        )
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn)
+
+
+@timed("db.player_game_log")
+def player_game_log(player):
+    query = text(f"""
+        SELECT p.player_name, g.game_date, {", ".join("g." + stat for stat in GAME_STATS)}
+        FROM players p
+        JOIN games g ON g.athlete_id = p.athlete_id
+        WHERE p.player_name = :player
+        ORDER BY g.game_date DESC
+    """)
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn, params={"player": player})
+
+
+@timed("db.athlete_game_log")
+def athlete_game_log(athlete_id):
+    # player_game_log() by athlete_id (served by ix_games_athlete_date), for
+    # players who share a display name or changed it
+    query = text(f"""
+        SELECT p.player_name, g.game_date, {", ".join("g." + stat for stat in GAME_STATS)}
+        FROM games g
+        JOIN players p ON p.athlete_id = g.athlete_id
+        WHERE g.athlete_id = :athlete_id
+        ORDER BY g.game_date DESC
+    """)
+    with get_engine().connect() as conn:
+        return pd.read_sql(query, conn, params={"athlete_id": int(athlete_id)})
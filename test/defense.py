@@ -0,0 +1,62 @@
+import numpy as np
+
+from boxscores import data_version
+from gamelog_index import COMBO_STATS
+from metrics import cache_result
+
+# ================================
+# Defense vs position
+# ================================
+# What each opponent allows to guards, forwards and centers. The snapshot
+# database keeps running sums per (opponent, position) that ingest increments
+# with the new game's rows only (see db.py), so a table here is a read of a
+# few dozen rows plus a division, cached per data version.
+
+VARIANTS = {
+    "per_game": "Per game",
+    "per_36": "Per 36 minutes",
+    "per_100": "Per 100 possessions",
+}
+
+_cache = {"version": None}
+
+
+def _scale(sums, variant):
+    # Denominator of each row for the chosen normalization
+    if variant == "per_game":
+        return sums["player_games"]
+    if variant == "per_36":
+        return sums["minutes"] / 36
+    if variant == "per_100":
+        return sums["possessions"] / 100
+    raise ValueError(f"Invalid variant: {variant}")
+
+
+def defense_vs_position(variant="per_game", last_n=None):
+    # One row per (opponent, position). Stats are per player game, per 36
+    # minutes or per 100 opponent possessions; minutes stay per player game.
+    version = data_version()
+    if _cache["version"] != version:
+        _cache.clear()
+        _cache["version"] = version
+
+    from db import DEFENSE_STATS, read_defense
+
+    key = (variant, last_n)
+    cache_result("defense", key in _cache)
+    if key not in _cache:
+        sums = read_defense(last_n)
+        # Combos are sums of base stats, so their sums combine like any other stat
+        for combo, parts in COMBO_STATS.items():
+            sums[combo] = sums[parts].sum(axis=1)
+
+        table = sums[["opponent_team_name", "position"]].copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = _scale(sums, variant).to_numpy()
+            for stat in DEFENSE_STATS + list(COMBO_STATS):
+                table[stat] = sums[stat].to_numpy() / scale
+            table["minutes"] = sums["minutes"].to_numpy() / sums["player_games"].to_numpy()
+        table["team_games"] = sums["team_games"].astype(int)
+        table["games_sampled"] = sums["player_games"].astype(int)
+        _cache[key] = table.sort_values(["position", "opponent_team_name"]).reset_index(drop=True)
+    return _cache[key]
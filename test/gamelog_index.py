@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+from boxscores import current_snapshot
+from metrics import cache_result, span, timed
+from snapshots import pin
+
+# ================================
+# Per-player game log index
+# ================================
+# Every player's games are stored presorted (most recent first) in one
+# contiguous block of each stat array. A player is an [start, end) range into
+# those arrays, so "last N games" is a slice and needs no query or sort.
+
+INDEX_STATS = ["minutes", "points", "rebounds", "assists", "three_pointers_made", "three_points_percentage"]
+COMBO_STATS = {
+    "PTS+REB+AST": ["points", "rebounds", "assists"],
+    "PTS+AST": ["points", "assists"],
+    "PTS+REB": ["points", "rebounds"],
+    "REB+AST": ["rebounds", "assists"],
+}
+# Everything a prop can be set on
+PROP_STATS = [stat for stat in INDEX_STATS if stat != "minutes"] + list(COMBO_STATS)
+INDEX_COLUMNS = ["athlete_id", "athlete_display_name", "game_date"] + INDEX_STATS
+
+# (version, index), replaced as a whole so the two always match
+_cached = {"entry": (None, None)}
+
+
+def build_games_frame(df):
+    # Index rows for freshly ingested box scores (the `games` table holds the rest)
+    games = df[[
+        "athlete_id", "athlete_display_name", "game_date", "minutes", "points", "rebounds", "assists",
+        "three_point_field_goals_made", "three_point_field_goals_attempted"
+    ]].copy()
+    games["game_date"] = games["game_date"].dt.strftime("%Y-%m-%d")
+    games["three_points_percentage"] = games["three_point_field_goals_made"] / games["three_point_field_goals_attempted"]
+    games = games.rename(columns={"three_point_field_goals_made": "three_pointers_made"})
+    return games.drop(columns=["three_point_field_goals_attempted"])
+
+
+class PlayerGameIndex:
+    def __init__(self, games, version=None):
+        games = games.sort_values(["athlete_id", "game_date"], ascending=[True, False], kind="stable")
+        self._set_rows(
+            version,
+            games["athlete_id"].to_numpy(),
+            games["athlete_display_name"].to_numpy(),
+            games["game_date"].to_numpy(),
+            {stat: games[stat].to_numpy(dtype="float64") for stat in INDEX_STATS},
+        )
+
+    def _set_rows(self, version, athlete_ids, names, dates, stats):
+        # Rows must already be grouped by athlete_id (ascending), most recent game first
+        self.version = version
+        self.athlete_ids, starts = np.unique(athlete_ids, return_index=True)
+        self.offsets = np.append(starts, len(athlete_ids))
+        self._position = {int(a): i for i, a in enumerate(self.athlete_ids)}
+
+        self.names = names
+        self.dates = dates
+        self.stats = dict(stats)
+        for combo, parts in COMBO_STATS.items():
+            # NaN (did not play) in any part makes the combo NaN
+            self.stats[combo] = sum(self.stats[part] for part in parts)
+
+        self.player_names = {int(a): names[s] for a, s in zip(self.athlete_ids, starts)}
+        self.name_to_id = {name: a for a, name in self.player_names.items()}
+
+        self.game_counts = np.diff(self.offsets)
+        self._matrices = {}
+
+    def to_frame(self, rows=slice(None)):
+        frame = pd.DataFrame({
+            "athlete_id": np.repeat(self.athlete_ids, self.game_counts)[rows],
+            "athlete_display_name": self.names[rows],
+            "game_date": self.dates[rows],
+        })
+        for stat in INDEX_STATS:
+            frame[stat] = self.stats[stat][rows]
+        return frame
+
+    def with_games(self, games, version=None):
+        # New index with `games` merged in. Only the affected players' blocks are
+        # re-sorted; every other block is carried over as-is.
+        row_athletes = np.repeat(self.athlete_ids, self.game_counts)
+        affected = np.isin(row_athletes, games["athlete_id"].unique())
+
+        merged = pd.concat([self.to_frame(affected), games[INDEX_COLUMNS]], ignore_index=True)
+        merged = merged.drop_duplicates().sort_values(["athlete_id", "game_date"], ascending=[True, False], kind="stable")
+
+        # Two runs that are each sorted by athlete_id: a stable sort is a linear merge
+        kept = ~affected
+        athlete_ids = np.concatenate([row_athletes[kept], merged["athlete_id"].to_numpy()])
+        order = np.argsort(athlete_ids, kind="stable")
+
+        index = PlayerGameIndex.__new__(PlayerGameIndex)
+        index._set_rows(
+            version,
+            athlete_ids[order],
+            np.concatenate([self.names[kept], merged["athlete_display_name"].to_numpy()])[order],
+            np.concatenate([self.dates[kept], merged["game_date"].to_numpy()])[order],
+            {stat: np.concatenate([self.stats[stat][kept], merged[stat].to_numpy(dtype="float64")])[order]
+             for stat in INDEX_STATS},
+        )
+        return index
+
+    def athlete_id(self, player):
+        return self.name_to_id.get(player)
+
+    def bounds(self, athlete_id):
+        i = self._position.get(athlete_id)
+        if i is None:
+            return 0, 0
+        return self.offsets[i], self.offsets[i + 1]
+
+    def game_count(self, athlete_id):
+        start, end = self.bounds(athlete_id)
+        return end - start
+
+    def values(self, athlete_id, stat, last_n=None):
+        start, end = self.bounds(athlete_id)
+        if last_n is not None:
+            end = min(end, start + last_n)
+        return self.stats[stat][start:end]
+
+    def count_over(self, athlete_id, stat, line, last_n=None):
+        return int((self.values(athlete_id, stat, last_n) > line).sum())
+
+    def count_under(self, athlete_id, stat, line, last_n=None):
+        return int((self.values(athlete_id, stat, last_n) < line).sum())
+
+    def positions(self, athlete_ids):
+        # Row of each athlete in stat_matrix(), -1 when the athlete is unknown
+        return np.array([self._position.get(a, -1) for a in athlete_ids], dtype="int64")
+
+    def stat_matrix(self, stat):
+        # players x games, most recent game in column 0, NaN padded on the right
+        if stat not in self._matrices:
+            rows = np.repeat(np.arange(len(self.athlete_ids)), self.game_counts)
+            cols = np.arange(self.offsets[-1]) - np.repeat(self.offsets[:-1], self.game_counts)
+            matrix = np.full((len(self.athlete_ids), self.game_counts.max(initial=0)), np.nan)
+            matrix[rows, cols] = self.stats[stat]
+            self._matrices[stat] = matrix
+        return self._matrices[stat]
+
+    def sorted_matrix(self, stat, last_n=None):
+        # stat_matrix() limited to the last_n games, each row sorted ascending
+        # with DNP (NaN) games moved to the end; for hit counts by binary search
+        key = (stat, last_n)
+        if key not in self._matrices:
+            self._matrices[key] = np.sort(self.stat_matrix(stat)[:, :last_n], axis=1)
+        return self._matrices[key]
+
+    def game_log(self, athlete_id, stat):
+        start, end = self.bounds(athlete_id)
+        return pd.DataFrame({
+            "player_name": self.player_names.get(athlete_id),
+            "game_date": self.dates[start:end],
+            "minutes": self.stats["minutes"][start:end],
+            stat: self.stats[stat][start:end],
+        })
+
+
+def get_index():
+    snapshot = current_snapshot()
+    cached_version, index = _cached["entry"]
+    cache_result("gamelog_index", cached_version == snapshot.version)
+    if cached_version != snapshot.version:
+        from db import read_games
+        # Read from the same snapshot the index is labelled with
+        with pin(snapshot):
+            games = read_games()
+        with span("gamelog_index.build"):
+            index = PlayerGameIndex(games, snapshot.version)
+        _cached["entry"] = (snapshot.version, index)
+    return index
+
+
+@timed("gamelog_index.apply_new_games")
+def apply_new_games(new_rows, base_version, version):
+    # Merge freshly ingested box score rows, appended to snapshot base_version
+    # and published as `version`, into the live index if one is built. An index
+    # of any other version lacks rows of another publish and is dropped instead.
+    cached_version, index = _cached["entry"]
+    if index is None or cached_version == version:
+        return
+    if cached_version != base_version:
+        _cached["entry"] = (None, None)
+        return
+    _cached["entry"] = (version, index.with_games(build_games_frame(new_rows), version))
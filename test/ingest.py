@@ -0,0 +1,159 @@
+import argparse
+import glob
+import os
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from boxscores import BOX_SCORE_CSV, CHUNK_ROWS, DATA_DIR, latest_stored_game, write_box_scores
+from metrics import span, timed
+from refresh import apply_new_games
+
+# ================================
+# Pluggable ingest sources
+# ================================
+# Every source returns wehoop-format player box score rows (the same columns
+# as wnbaboxscore.csv). Only WehoopSource needs R; the others run offline.
+
+FIXTURE_DIR = os.path.join(DATA_DIR, "fixtures")
+
+
+def _season_row_groups(parquet, season):
+    # Row groups that may hold the season's rows
+    column = parquet.schema_arrow.get_field_index("season")
+    groups = []
+    for i in range(parquet.num_row_groups):
+        stats = parquet.metadata.row_group(i).column(column).statistics
+        if stats is None or not stats.has_min_max or stats.min <= season <= stats.max:
+            groups.append(i)
+    return groups
+
+
+class IngestSource:
+    name = "base"
+
+    def fetch(self, since_date=None, season=None):
+        raise NotImplementedError
+
+    def fetch_season(self, season):
+        # Rows of exactly one season (see backfill.py)
+        rows = self.fetch(season=season)
+        return rows[rows["season"] == season]
+
+
+class WehoopSource(IngestSource):
+    name = "wehoop"
+
+    def fetch(self, since_date=None, season=None):
+        # Imported here so R is only embedded when a refresh actually runs
+        from r import fetch_player_box
+        return fetch_player_box(since_date=since_date, season=season)
+
+    def fetch_season(self, season):
+        from r import fetch_player_box
+        return fetch_player_box(season=season, last_season=season)
+
+
+class DumpSource(IngestSource):
+    # A wehoop-format CSV or Parquet dump, e.g. from wehoop's release files
+    name = "dump"
+
+    def __init__(self, path):
+        self.path = path
+
+    def _files(self):
+        return [self.path]
+
+    def _chunks(self, path, season=None):
+        # Bounded reads: dumps can hold every season, and most fetches keep one.
+        # season: skip the Parquet row groups whose statistics rule it out.
+        if path.endswith(".parquet"):
+            parquet = pq.ParquetFile(path)
+            row_groups = None if season is None else _season_row_groups(parquet, season)
+            for batch in parquet.iter_batches(batch_size=CHUNK_ROWS, row_groups=row_groups):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, chunksize=CHUNK_ROWS)
+
+    def _read(self, select, season=None):
+        # select(chunk) -> the chunk's rows to keep, applied chunk by chunk
+        paths = self._files()
+        if not paths:
+            raise FileNotFoundError(f"No box score files found for {self.name} source: {self.path}")
+        frames = [select(df) for path in paths for df in self._chunks(path, season)]
+        return pd.concat(frames, ignore_index=True)
+
+    def fetch(self, since_date=None, season=None):
+        def select(df):
+            if season is not None:
+                df = df[df["season"] >= season]
+            if since_date is not None:
+                df = df[pd.to_datetime(df["game_date"]) >= pd.Timestamp(since_date)]
+            return df
+        return self._read(select)
+
+    def fetch_season(self, season):
+        # Keeps only the season's rows while reading, so a backfill worker never
+        # holds more of the dump than one chunk and its own season
+        return self._read(lambda df: df[df["season"] == season], season)
+
+
+class FixtureSource(DumpSource):
+    # Every CSV/Parquet file in a local directory, read in name order
+    name = "fixture"
+
+    def __init__(self, path=FIXTURE_DIR):
+        super().__init__(path)
+
+    def _files(self):
+        return sorted(glob.glob(os.path.join(self.path, "*.csv")) + glob.glob(os.path.join(self.path, "*.parquet")))
+
+
+SOURCES = {
+    WehoopSource.name: WehoopSource,
+    DumpSource.name: DumpSource,
+    FixtureSource.name: FixtureSource,
+}
+
+
+def get_source(name=None, path=None):
+    name = name or os.environ.get("WNBA_INGEST_SOURCE", WehoopSource.name)
+    path = path or os.environ.get("WNBA_INGEST_PATH")
+    if name not in SOURCES:
+        raise ValueError(f"Unknown ingest source: {name}")
+    if name == WehoopSource.name:
+        return WehoopSource()
+    if name == DumpSource.name and path is None:
+        raise ValueError("The dump source needs a file path")
+    return SOURCES[name](path) if path else SOURCES[name]()
+
+
+@timed("ingest.run")
+def run_ingest(source=None, incremental=True):
+    source = source or get_source()
+    latest = latest_stored_game() if incremental and os.path.exists(BOX_SCORE_CSV) else None
+
+    if latest is None:
+        with span("ingest.fetch"):
+            rows = source.fetch()
+        write_box_scores(rows)
+        print(f"Loaded {len(rows)} rows from the {source.name} source.")
+        return rows
+
+    since_date = latest["game_date"].strftime("%Y-%m-%d")
+    with span("ingest.fetch"):
+        rows = source.fetch(since_date=since_date, season=latest["season"])
+    return apply_new_games(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the WNBA box score store")
+    parser.add_argument("--source", choices=sorted(SOURCES), default=None)
+    parser.add_argument("--path", default=None, help="File (dump) or directory (fixture) to read")
+    parser.add_argument("--full", action="store_true", help="Replace the whole store instead of appending")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    run_ingest(get_source(args.source, args.path), incremental=not args.full)
+    print(f"Ingest finished in {time.perf_counter() - start:.2f}s")
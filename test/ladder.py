@@ -0,0 +1,113 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from gamelog_index import get_index
+from metrics import timed
+from names import get_resolver
+from probability import MODEL_STATS, fair_odds, get_distributions, price, resolve_opponent
+from slate import SLATE_WINDOWS
+
+# ================================
+# Line ladder
+# ================================
+# Over and under hit rates at every half-point line across each player's
+# range, for every SLATE_WINDOWS window, from one query. Each window's values
+# are presorted per player (PlayerGameIndex.sorted_matrix), so the games under
+# a line are a binary search, and one searchsorted answers every (player, line)
+# pair at once. Rates use the same denominators as the slate (DNP games count
+# as misses); model columns come from the cached simulations.
+#
+#   python ladder.py points "A'ja Wilson" "Kelsey Plum"
+
+# Half-point lines only make sense for counting stats
+LADDER_STATS = MODEL_STATS
+
+
+def ladder_lines(sorted_values):
+    # Every half-point line from just below each row's lowest value to just above
+    # its highest, as (row of each line, line). Rows with no played game get none.
+    played = (~np.isnan(sorted_values)).sum(axis=1)
+    rows = np.flatnonzero(played)
+    low = np.maximum(np.floor(sorted_values[rows, 0]) - 0.5, 0.5)
+    high = np.floor(sorted_values[rows, played[rows] - 1]) + 0.5
+    counts = (high - low).astype(int) + 1
+    steps = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(rows, counts), np.repeat(low, counts) + steps
+
+
+def count_below(sorted_values, line_rows, lines, side="left"):
+    # Games in each line's row below it ("left") or at or below it ("right").
+    # Rows are shifted apart so the flattened matrix is sorted as a whole, with
+    # NaN replaced by a value above every line.
+    n, width = sorted_values.shape
+    played = ~np.isnan(sorted_values)
+    low = min(sorted_values[played].min(initial=0.0), lines.min(initial=0.0))
+    top = max(sorted_values[played].max(initial=0.0), lines.max(initial=0.0)) + 1
+    shift = np.arange(n) * (top - low + 1)
+    flat = (np.where(played, sorted_values, top) - low + shift[:, None]).ravel()
+    return np.searchsorted(flat, lines - low + shift[line_rows], side=side) - line_rows * width
+
+
+@timed("line_ladder")
+def line_ladder(athlete_ids, stat, opponent=None):
+    # One row per (player, line). Unknown players and players without a played
+    # game are left out.
+    if stat not in LADDER_STATS:
+        raise ValueError(f"Invalid stat: {stat}")
+    opponent = resolve_opponent(opponent)
+    index = get_index()
+    athlete_ids = np.asarray(athlete_ids, dtype="int64")
+    rows = index.positions(athlete_ids)
+    athlete_ids, rows = athlete_ids[rows >= 0], rows[rows >= 0]
+
+    line_rows, lines = ladder_lines(index.sorted_matrix(stat)[rows])
+    ladder = pd.DataFrame({
+        "athlete_id": athlete_ids[line_rows],
+        "player": [index.player_names[a] for a in athlete_ids[line_rows]],
+        "stat": stat,
+        "line": lines,
+    })
+
+    games = index.game_counts[rows]
+    for name, window in SLATE_WINDOWS.items():
+        values = index.sorted_matrix(stat, window)[rows]
+        window_games = (np.minimum(games, window) if window else games)[line_rows]
+        played = (~np.isnan(values)).sum(axis=1)[line_rows]
+        ladder[f"games_{name}"] = window_games
+        ladder[f"over_rate_{name}"] = (played - count_below(values, line_rows, lines, "right")) / window_games
+        ladder[f"under_rate_{name}"] = count_below(values, line_rows, lines) / window_games
+
+    distributions = get_distributions([(int(a), stat, opponent, None) for a in athlete_ids])
+    over, _, under = price([distributions[row] for row in line_rows], lines)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ladder["model_over"] = over
+        ladder["model_under"] = under
+        ladder["fair_odds_over"] = fair_odds(over / (over + under))
+        ladder["fair_odds_under"] = fair_odds(under / (over + under))
+    return ladder
+
+
+def format_ladder(ladder):
+    # Percentages and odds as text, one table per player's lines
+    table = pd.DataFrame({"player": ladder["player"], "line": ladder["line"]})
+    for name in SLATE_WINDOWS:
+        table[f"over_{name}"] = (ladder[f"over_rate_{name}"] * 100).map("{:.0f}%".format)
+    table["model_over"] = (ladder["model_over"] * 100).map("{:.1f}%".format)
+    table["fair_over"] = ladder["fair_odds_over"].map("{:+.0f}".format)
+    table["fair_under"] = ladder["fair_odds_under"].map("{:+.0f}".format)
+    return table.replace({"nan%": "", "+nan": "", "nan": ""})
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python ladder.py stat player [player ...]")
+        sys.exit(1)
+
+    resolver = get_resolver()
+    ids = [resolver.resolve(p) for p in sys.argv[2:]]
+    unknown = [p for p, a in zip(sys.argv[2:], ids) if a is None]
+    if unknown:
+        print(f"Unknown players: {unknown}")
+    print(format_ladder(line_ladder([a for a in ids if a is not None], sys.argv[1])).to_string(index=False))
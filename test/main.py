@@ -1,66 +1,134 @@
+import sys
+
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sqlalchemy import create_engine, text
-from datetime import datetime, timedelta
-import time
 
 from playerstats import get_player_stats
 from bettingline import betting_line
-from r import install_and_load
-
-# Setup in-memory SQLite engine
-engine = create_engine('sqlite:///:memory:')
+from slate import evaluate_slate
+from ladder import LADDER_STATS, format_ladder, line_ladder
+from correlation import prop_correlations, prop_parlay
+from names import get_resolver
+from gamelog_index import PROP_STATS
+from refresher import get_refresher, is_stale, last_game_date, wait_until_idle
+from boxscores import has_box_scores, load_latest_season
+from metrics import summary_rows, trace
 
-# Load data
-df = pd.read_csv('wnbaboxscore.csv')
+# python main.py --debug prints a timing breakdown after every command
+DEBUG = "--debug" in sys.argv
+# Menu options that look data up (timed as one trace each)
+COMMANDS = ["1", "2", "3", "4", "5"]
 
 #############################
 # Main execution
 #############################
 def check_data_freshness(df):
-    today = datetime.today().date()
-    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
-
     if df.empty:
-        print("⚠️ CSV is empty. Attempting to load fresh data...")
-        install_and_load()
+        print("⚠️ CSV is empty. Loading fresh data in the background...")
+        get_refresher().request_refresh()
+    elif is_stale(df):
+        print(f"📅 Data is outdated. Last game in CSV: {last_game_date(df)}")
+        print("🔄 Refreshing in the background; lookups use the current data until it finishes.")
+        get_refresher().request_refresh()
     else:
-        last_game_date = df["game_date"][0]
-        if last_game_date < yesterday:
-            print(f"📅 Data is outdated. Last game in CSV: {last_game_date}")
-            install_and_load()
-        else:
-            print(f"✅ Data is up to date. Last game date: {last_game_date}")
+        print(f"✅ Data is up to date. Last game date: {last_game_date(df)}")
+
+def print_timing_report():
+    spans, caches = summary_rows()
+    print("\n⏱ Timings since start:")
+    print(pd.DataFrame(spans).to_string(index=False, float_format="{:.2f}".format) if spans else "  (none yet)")
+    print("\n📦 Cache hit rates:")
+    print(pd.DataFrame(caches).to_string(index=False) if caches else "  (none yet)")
+
+def run_command(choice):
+    with trace(f"cli.option_{choice}") as command_trace:
+        handle_command(choice)
+    if DEBUG:
+        print(f"\n⏱ {command_trace.report()}")
+
+def handle_command(choice):
+    if choice == "1":
+        player = input("Enter player name: ").strip()
+        get_player_stats("season stats", player)
+
+    elif choice == "2":
+        player = input("Enter player name: ").strip()
+        stat = input(f"Enter stat ({', '.join(PROP_STATS)}): ").strip()
+        try:
+            line = float(input("Enter betting line (e.g., 15.5): "))
+        except ValueError:
+            print("❌ Invalid number. Try again.")
+            return
+
+        over_under = input("Enter (over/under): ").strip().lower()
+        if over_under not in ["over", "under"]:
+            print("❌ Invalid input for over/under.")
+            return
+        opponent = input("Enter opponent (optional): ").strip() or None
+
+        try:
+            _, summary = betting_line(stat, player, line, over_under, opponent, details=True)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        print(summary)
+
+    elif choice == "3":
+        path = input("Enter props CSV path (player, stat, line, over_under): ").strip()
+        try:
+            print(evaluate_slate(path).to_string(index=False))
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+
+    elif choice == "4":
+        players = [p.strip() for p in input("Enter player names (comma separated): ").split(",") if p.strip()]
+        stat = input(f"Enter stat ({', '.join(LADDER_STATS)}): ").strip()
+        opponent = input("Enter opponent (optional): ").strip() or None
+        resolver = get_resolver()
+        athlete_ids = []
+        for player in players:
+            athlete_id = resolver.resolve(player)
+            if athlete_id is None:
+                print(f"❌ No data found for player: {player}")
+            else:
+                athlete_ids.append(athlete_id)
+        try:
+            ladder = line_ladder(athlete_ids, stat, opponent)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        print(format_ladder(ladder).to_string(index=False))
+
+    elif choice == "5":
+        path = input("Enter props CSV path (player, stat, line, over_under): ").strip()
+        try:
+            pairs = prop_correlations(path)
+            parlay = prop_parlay(path)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            return
+        columns = ["player_a", "stat_a", "line_a", "over_under_a", "player_b", "stat_b", "line_b", "over_under_b",
+                   "relation", "games", "correlation", "joint_hit_rate", "lift"]
+        print(pairs[columns].to_string(index=False, float_format="{:.2f}".format))
+        if parlay["games"]:
+            print(f"\nAll {parlay['legs']} props hit together in "
+                  f"{parlay['hits']} of {parlay['games']} shared games ({parlay['hit_rate'] * 100:.1f}%)")
 
 def interactive_prompt():
     while True:
         print("\n🟣 Choose an option:")
         print("1 - Season Stats")
         print("2 - Betting Line")
+        print("3 - Evaluate Slate (CSV of props)")
+        print("4 - Line Ladder (hit rates at every line)")
+        print("5 - Same-Game Correlations (CSV of props)")
+        print("9 - Timing and Cache Report")
         print("0 - Exit")
         choice = input("Enter your choice: ").strip()
 
-        if choice == "1":
-            player = input("Enter player name: ").strip()
-            get_player_stats("season stats", player)
-
-        elif choice == "2":
-            player = input("Enter player name: ").strip()
-            stat = input("Enter stat (points, rebounds, assists, three_pointers_made, three_points_percentage): ").strip()
-            try:
-                line = float(input("Enter betting line (e.g., 15.5): "))
-            except ValueError:
-                print("❌ Invalid number. Try again.")
-                continue
-
-            over_under = input("Enter (over/under): ").strip().lower()
-            if over_under not in ["over", "under"]:
-                print("❌ Invalid input for over/under.")
-                continue
-
-            betting_line(stat, player, line, over_under)
-
+        if choice in COMMANDS:
+            run_command(choice)
+        elif choice == "9":
+            print_timing_report()
         elif choice == "0":
             print("👋 Exiting. Have a great day!")
             break
@@ -68,5 +136,9 @@ def interactive_prompt():
             print("❌ Invalid option. Please try again.")
 
 if __name__ == "__main__":
-    check_data_freshness(df)
+    if not has_box_scores():
+        print("⚠️ No box scores yet. Loading them now...")
+        get_refresher().request_refresh()
+        wait_until_idle()
+    check_data_freshness(load_latest_season())
     interactive_prompt()
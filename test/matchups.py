@@ -0,0 +1,76 @@
+import pandas as pd
+
+from boxscores import load_box_scores, data_version
+from defense import defense_vs_position
+from gamelog_index import COMBO_STATS
+from metrics import cache_result, timed
+
+# ================================
+# Cached opponent x position matchup aggregates
+# ================================
+# Built once per box score data version and shared by every session in the
+# process. Switching team/position in the UI is then a dictionary lookup.
+# Opponent x position tables are read from the defense-vs-position store.
+
+POSITIONS = ["G", "F", "C"]
+MATCHUP_METRICS = ["points", "assists", "rebounds", "three_point_field_goals_made", "steals", "blocks", "PTS+REB+AST"]
+MATCHUP_WINDOWS = {"All games": None, "Last 5 games": 5, "Last 10 games": 10}
+LOG_COLUMNS = ['game_date', 'opponent_team_name', 'minutes', 'points', 'rebounds', 'assists',
+               'three_point_field_goals_made', 'PTS+REB+AST', 'PTS+AST', 'PTS+REB', 'REB+AST']
+
+_cache = {"version": None}
+
+
+def invalidate():
+    _cache.clear()
+    _cache["version"] = None
+
+
+def _current():
+    version = data_version()
+    if _cache["version"] != version:
+        invalidate()
+        _cache["version"] = version
+    return _cache
+
+
+def team_names():
+    cache = _current()
+    if "teams" not in cache:
+        cache["teams"] = sorted(load_box_scores()["team_name"].unique())
+    return cache["teams"]
+
+
+def matchups_by_position(variant="per_game", last_n=None):
+    # variant: per_game, per_36 or per_100 (possessions); last_n limits each
+    # opponent to its most recent games
+    cache = _current()
+    key = ("matchups", variant, last_n)
+    cache_result("matchups", key in cache)
+    if key not in cache:
+        matchups = defense_vs_position(variant, last_n).rename(columns={"position": "athlete_position_abbreviation"})
+        cache[key] = {pos: matchups[matchups["athlete_position_abbreviation"] == pos] for pos in POSITIONS}
+    return cache[key]
+
+
+@timed("matchups.last_10_logs")
+def _last_10_logs():
+    df = load_box_scores()
+    df = df.sort_values(["athlete_display_name", "game_date"], ascending=[True, False])
+    last_10 = df.groupby(["team_name", "athlete_position_abbreviation", "athlete_display_name"],
+                         observed=True).head(10).copy()
+    for combo, parts in COMBO_STATS.items():
+        last_10[combo] = last_10[parts].sum(axis=1, min_count=len(parts))
+
+    return {
+        (str(team), str(pos)): group
+        for (team, pos), group in last_10.groupby(["team_name", "athlete_position_abbreviation"], observed=True)
+    }
+
+
+def last_10_game_logs(team_name, position):
+    cache = _current()
+    cache_result("matchups.logs", "logs" in cache)
+    if "logs" not in cache:
+        cache["logs"] = _last_10_logs()
+    return cache["logs"].get((team_name, position), pd.DataFrame(columns=LOG_COLUMNS + ["athlete_display_name"]))
@@ -0,0 +1,204 @@
+import atexit
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ================================
+# Instrumentation: spans, traces and metrics
+# ================================
+# span("name") times a block. Every span feeds a process-wide latency
+# histogram; when the thread is inside trace(...) (one page render, one API
+# request, one CLI command) it is also added to that trace, which gives the
+# per-request breakdown. Caches report hits and misses with cache_result().
+# Metrics export as JSON (write_metrics) or Prometheus text (prometheus_text).
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = [0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+# Written at exit when set, e.g. WNBA_METRICS_FILE=metrics.json streamlit run app.py
+METRICS_FILE = os.environ.get("WNBA_METRICS_FILE")
+
+_lock = threading.Lock()
+_histograms = {}
+_cache_counts = {}
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + [float("inf")], self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else None,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "max_seconds": self.max,
+            "buckets": {str(bound): count for bound, count in zip(BUCKETS + ["+Inf"], self.counts)},
+        }
+
+
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.depth = 0
+
+    def rows(self):
+        # Spans in the order they started, with nesting depth and offset from the trace start
+        return [
+            {"span": name, "depth": depth, "start_ms": (start - self.start) * 1000, "ms": seconds * 1000}
+            for start, depth, name, seconds in sorted(self.spans)
+        ]
+
+    def report(self):
+        lines = [f"{self.name}: {(self.duration or 0) * 1000:.1f} ms"]
+        for row in self.rows():
+            lines.append(f"{'  ' * (row['depth'] + 1)}{row['span']:<{40 - 2 * row['depth']}} {row['ms']:>9.2f} ms")
+        return "\n".join(lines)
+
+
+def observe(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name):
+    trace = current_trace()
+    depth = 0
+    if trace is not None:
+        depth = trace.depth
+        trace.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe(name, seconds)
+        if trace is not None:
+            trace.depth -= 1
+            trace.spans.append((start, depth, name, seconds))
+
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace(name):
+    # Collects every span on this thread until the block exits
+    previous = current_trace()
+    _local.trace = Trace(name)
+    try:
+        with span(name):
+            yield _local.trace
+    finally:
+        _local.trace.duration = time.perf_counter() - _local.trace.start
+        _local.trace = previous
+
+
+def cache_result(cache, hit):
+    with _lock:
+        counts = _cache_counts.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def snapshot():
+    with _lock:
+        spans = {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())}
+        caches = {}
+        for name, counts in sorted(_cache_counts.items()):
+            total = counts["hits"] + counts["misses"]
+            caches[name] = dict(counts, hit_rate=counts["hits"] / total if total else None)
+    return {"pid": os.getpid(), "time": time.time(), "spans": spans, "caches": caches}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _cache_counts.clear()
+
+
+def write_metrics(path=None):
+    path = path or METRICS_FILE
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def prometheus_text():
+    data = snapshot()
+    lines = ["# HELP wnba_span_seconds Time spent in instrumented spans",
+             "# TYPE wnba_span_seconds histogram"]
+    for name, histogram in data["spans"].items():
+        cumulative = 0
+        for bound, count in histogram["buckets"].items():
+            cumulative += count
+            lines.append(f'wnba_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'wnba_span_seconds_sum{{span="{name}"}} {histogram["total_seconds"]}')
+        lines.append(f'wnba_span_seconds_count{{span="{name}"}} {histogram["count"]}')
+
+    lines += ["# HELP wnba_cache_requests_total Cache lookups by result",
+              "# TYPE wnba_cache_requests_total counter"]
+    for name, counts in data["caches"].items():
+        lines.append(f'wnba_cache_requests_total{{cache="{name}",result="hit"}} {counts["hits"]}')
+        lines.append(f'wnba_cache_requests_total{{cache="{name}",result="miss"}} {counts["misses"]}')
+    return "\n".join(lines) + "\n"
+
+
+def summary_rows():
+    # One row per span and cache, for tables in the debug panel and the CLI
+    data = snapshot()
+    spans = [
+        {"span": name, "count": h["count"], "mean_ms": h["mean_seconds"] * 1000,
+         "p50_ms": h["p50_seconds"] * 1000, "p95_ms": h["p95_seconds"] * 1000, "max_ms": h["max_seconds"] * 1000}
+        for name, h in data["spans"].items()
+    ]
+    caches = [dict(cache=name, **counts) for name, counts in data["caches"].items()]
+    return spans, caches
+
+
+if METRICS_FILE:
+    atexit.register(write_metrics)
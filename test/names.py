@@ -0,0 +1,133 @@
+import bisect
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from boxscores import data_version, load_players
+from metrics import cache_result, span
+
+# ================================
+# Player name resolution
+# ================================
+# Built once per data version. Names are ASCII-folded and lower-cased, and each
+# player is reachable by full name, ESPN short name ("A. Wilson") and last name
+# when those are unambiguous. Anything else goes through a trigram index, so a
+# typo or a missing accent still resolves to the right athlete_id.
+
+FUZZY_THRESHOLD = 0.45
+SUGGESTIONS = 10
+
+_cached = {"version": None, "resolver": None}
+
+
+def normalize(name):
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = re.sub(r"['’.]", "", name)
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameResolver:
+    def __init__(self, players):
+        # players: one row per athlete_id with athlete_display_name and athlete_short_name
+        self.names = dict(zip(players["athlete_id"].astype(int), players["athlete_display_name"].astype(str)))
+
+        aliases = defaultdict(set)
+        for athlete_id, full, short in zip(self.names, players["athlete_display_name"], players["athlete_short_name"]):
+            full = normalize(full)
+            aliases[full].add(athlete_id)
+            if isinstance(short, str) and short:
+                aliases[normalize(short)].add(athlete_id)
+            if " " in full:
+                aliases[full.rsplit(" ", 1)[1]].add(athlete_id)
+        self.aliases = dict(aliases)
+
+        # Fuzzy matching runs against full and short names only
+        self.keys = [key for key, ids in self.aliases.items() if " " in key]
+        self.key_trigrams = [len(trigrams(key)) for key in self.keys]
+        self.postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                self.postings[gram].append(i)
+
+        # Autocomplete: every full name and every word a full name starts with
+        prefixes = set()
+        for athlete_id, full in self.names.items():
+            words = normalize(full).split()
+            for i in range(len(words)):
+                prefixes.add((" ".join(words[i:]), athlete_id))
+        self.prefixes = sorted(prefixes)
+        self.prefix_keys = [key for key, _ in self.prefixes]
+
+    def _fuzzy(self, query):
+        grams = trigrams(query)
+        shared = Counter(i for gram in grams for i in self.postings.get(gram, ()))
+        scored = []
+        for i, count in shared.items():
+            score = count / (len(grams) + self.key_trigrams[i] - count)
+            scored.append((score, self.keys[i]))
+        scored.sort(reverse=True)
+        return scored
+
+    def resolve(self, query):
+        # athlete_id for a name as typed, or None when nothing matches well enough
+        query = normalize(query)
+        if not query:
+            return None
+        ids = self.aliases.get(query)
+        if ids is not None:
+            return next(iter(ids)) if len(ids) == 1 else None
+
+        for score, key in self._fuzzy(query):
+            if score < FUZZY_THRESHOLD:
+                break
+            ids = self.aliases[key]
+            if len(ids) == 1:
+                return next(iter(ids))
+        return None
+
+    def name(self, athlete_id):
+        return self.names.get(athlete_id)
+
+    def suggest(self, query, limit=SUGGESTIONS):
+        # Display names for autocomplete: prefix matches first, then fuzzy ones
+        query = normalize(query)
+        if not query:
+            return []
+        found = []
+        start = bisect.bisect_left(self.prefix_keys, query)
+        for key, athlete_id in self.prefixes[start:]:
+            if not key.startswith(query) or len(found) >= limit:
+                break
+            if athlete_id not in found:
+                found.append(athlete_id)
+
+        for score, key in self._fuzzy(query):
+            if len(found) >= limit or score < FUZZY_THRESHOLD / 2:
+                break
+            found.extend(a for a in sorted(self.aliases[key]) if a not in found)
+        return [self.names[a] for a in found[:limit]]
+
+
+def get_resolver():
+    version = data_version()
+    cache_result("names", _cached["version"] == version)
+    if _cached["version"] != version:
+        players = load_players()
+        with span("names.build"):
+            _cached["resolver"] = NameResolver(players)
+        _cached["version"] = version
+    return _cached["resolver"]
+
+
+def resolve_player(query):
+    return get_resolver().resolve(query)
+
+
+def suggest_players(query, limit=SUGGESTIONS):
+    return get_resolver().suggest(query, limit)
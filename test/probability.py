@@ -0,0 +1,302 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from boxscores import data_version, load_players, load_teams
+from defense import defense_vs_position
+from gamelog_index import PROP_STATS, get_index
+from metrics import cache_result, span, timed
+
+# ================================
+# Monte Carlo prop probabilities
+# ================================
+# A player's stat is modeled per minute: a recency-weighted rate per minute,
+# times minutes resampled from recent games (optionally rescaled to a
+# projected average), times an opponent factor (what the opponent allows the
+# player's position per 36 minutes against the league average, shrunk toward
+# 1 on small samples). Game-to-game noise is gamma-Poisson (negative
+# binomial), with an overdispersion fit from the player's own games.
+#
+# The simulations draw minutes; the count given a minutes draw is not drawn
+# but taken as its exact negative binomial distribution, averaged over the
+# draws, so every stat of a whole batch is computed in a few array passes.
+# Each simulation is kept as a cumulative distribution over 0, 1, 2, ...
+# and cached per data version, so pricing any line for an already simulated
+# (player, stat, opponent, minutes) is one array lookup. Every player's
+# minutes come from their own generator, seeded from the player and the data
+# version, so a price does not depend on what else is simulated in the same call.
+
+SIMULATIONS = 10_000
+SEED = 0
+# Simulated together; bounds the (players x simulations) minutes draws
+BATCH_SIZE = 256
+FIT_GAMES = 20
+HALF_LIFE_GAMES = 10
+# Opponent games at which the opponent factor is halfway between 1 and its raw value
+OPPONENT_PRIOR_GAMES = 10
+MAX_DISPERSION = 10.0
+# Count distributions end once less than this is left above them, and never
+# run past MAX_COUNT
+TAIL_PROBABILITY = 1e-9
+MAX_COUNT = 1000
+# Counting stats only; a percentage has no per-minute model
+MODEL_STATS = [stat for stat in PROP_STATS if stat != "three_points_percentage"]
+DEFENSE_STAT = {"three_pointers_made": "three_point_field_goals_made"}
+
+_cache = {"version": None}
+
+
+def _current():
+    version = data_version()
+    if _cache["version"] != version:
+        _cache.clear()
+        _cache.update(version=version, distributions={}, factors={})
+    return _cache
+
+
+# ================================
+# Fitting
+# ================================
+def _recency_weights(width):
+    return 0.5 ** (np.arange(width) / HALF_LIFE_GAMES)
+
+
+def fit_players(index, stat, rows):
+    # Per player, from the last FIT_GAMES played games: rate per minute and
+    # overdispersion (1 = Poisson)
+    minutes = index.stat_matrix("minutes")[rows, :FIT_GAMES]
+    values = index.stat_matrix(stat)[rows, :FIT_GAMES]
+    played = (minutes > 0) & ~np.isnan(values)
+    weights = np.where(played, _recency_weights(minutes.shape[1]), 0.0)
+    minutes = np.where(played, minutes, 0.0)
+    values = np.where(played, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = (weights * values).sum(axis=1) / (weights * minutes).sum(axis=1)
+
+        # Pearson dispersion of each game around rate * minutes, small-sample corrected
+        expected = rate[:, None] * minutes
+        used = weights * (expected > 0)
+        pearson = np.where(used > 0, (values - expected) ** 2 / expected, 0.0)
+        games = (used > 0).sum(axis=1)
+        dispersion = (used * pearson).sum(axis=1) / used.sum(axis=1) * games / (games - 1)
+    dispersion = np.clip(np.nan_to_num(dispersion, nan=1.0), 1.0, MAX_DISPERSION)
+    return rate, dispersion
+
+
+def opponent_factors(stat):
+    # {(opponent, position): factor} from what each opponent allows per 36 minutes
+    cache = _current()
+    if stat not in cache["factors"]:
+        table = defense_vs_position("per_36")
+        column = DEFENSE_STAT.get(stat, stat)
+        league = table.groupby("position")[column].transform("mean")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            raw = (table[column] / league).fillna(1.0)
+        shrink = table["team_games"] / (table["team_games"] + OPPONENT_PRIOR_GAMES)
+        factors = 1.0 + (raw - 1.0) * shrink
+        cache["factors"][stat] = dict(zip(zip(table["opponent_team_name"], table["position"]), factors))
+    return cache["factors"][stat]
+
+
+def player_positions():
+    cache = _current()
+    if "positions" not in cache:
+        players = load_players()
+        cache["positions"] = dict(zip(players["athlete_id"], players["athlete_position_abbreviation"]))
+    return cache["positions"]
+
+
+def resolve_opponent(name):
+    # Team name as the defense tables store it ("Aces") from a nickname,
+    # full name, city or abbreviation; None for no opponent
+    if name is None or pd.isna(name) or not str(name).strip():
+        return None
+    cache = _current()
+    if "teams" not in cache:
+        teams = load_teams()
+        lookup = {}
+        for col in ["team_display_name", "team_location", "team_abbreviation", "team_name"]:
+            lookup.update({str(value).casefold(): team for value, team in zip(teams[col], teams["team_name"])})
+        cache["teams"] = lookup
+    team = cache["teams"].get(str(name).strip().casefold())
+    if team is None:
+        raise ValueError(f"Unknown opponent: {name}")
+    return team
+
+
+# ================================
+# Simulation
+# ================================
+def key_rng(version, *key):
+    # Generator for one simulation key; the same key and version always draw the same numbers
+    digest = hashlib.sha256(repr((version,) + key).encode()).digest()
+    return np.random.default_rng([SEED, int.from_bytes(digest[:8], "little")])
+
+
+def sample_minutes(index, athlete_ids, version):
+    # Per player, the minutes of the last FIT_GAMES games and how many of
+    # SIMULATIONS recency-weighted draws picked each of them (no draws for
+    # players without a played game). Each player's draws come from their own
+    # generator; rows are offset by their index so one searchsorted picks for
+    # all of them.
+    rows = index.positions(athlete_ids)
+    minutes = index.stat_matrix("minutes")[np.maximum(rows, 0), :FIT_GAMES]
+    n, width = minutes.shape
+    played = (minutes > 0) & (rows >= 0)[:, None]
+    weights = np.where(played, _recency_weights(width), 0.0)
+    total = weights.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cumulative = np.nan_to_num(np.cumsum(weights, axis=1) / total, nan=1.0)
+
+    uniforms = np.array([key_rng(version, int(a), "minutes").random(SIMULATIONS) for a in athlete_ids])
+    offsets = np.arange(n)[:, None]
+    picks = np.searchsorted((cumulative + offsets).ravel(), uniforms + offsets, side="right") - offsets * width
+    # Rounding can leave a draw past the last played game
+    last = width - 1 - np.argmax(played[:, ::-1], axis=1)
+    picks = np.minimum(picks, last[:, None])
+    counts = np.bincount((picks + offsets * width).ravel(), minlength=n * width).reshape(n, width)
+    counts[total[:, 0] == 0] = 0
+    return np.where(played, minutes, 0.0), counts
+
+
+def _simulate(index, stat, keys, minutes, counts):
+    # Cumulative distributions for (athlete_id, stat, opponent, minutes) keys of
+    # one stat, given each key's simulated minutes (see sample_minutes)
+    rate, dispersion = fit_players(index, stat, np.maximum(index.positions([key[0] for key in keys]), 0))
+    factors = opponent_factors(stat)
+    positions = player_positions()
+    factor = np.array([factors.get((opponent, positions.get(athlete_id)), 1.0) if opponent else 1.0
+                       for athlete_id, _, opponent, _ in keys])
+    projected = np.array([key[3] or np.nan for key in keys])
+
+    distributions = [None] * len(keys)
+    live = np.flatnonzero(np.isfinite(rate) & (counts.sum(axis=1) > 0))
+    if len(live) == 0:
+        return distributions
+    share = counts[live] / SIMULATIONS
+    minutes = minutes[live]
+    # A projection rescales the player's minutes distribution to that average
+    projected = projected[live]
+    scale = np.where(np.isnan(projected), 1.0, projected / (share * minutes).sum(axis=1))
+    mean = rate[live, None] * factor[live, None] * scale[:, None] * minutes
+
+    # Gamma(mean / extra, extra) noise under a Poisson draw makes the count
+    # negative binomial with r = mean / extra and p = extra / (1 + extra)
+    # (Poisson when extra is 0). Rather than drawing it for every simulation,
+    # each simulated minutes value contributes its exact count distribution,
+    # built up one count at a time, in proportion to how often it was drawn.
+    extra = np.broadcast_to(dispersion[live, None] - 1.0, mean.shape)
+    poisson = extra == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(poisson, 0.0, mean / extra)
+        p = extra / (1.0 + extra)
+    pmf = np.where(poisson, np.exp(-mean), np.exp(-r * np.log1p(extra)))
+    total = (share * pmf).sum(axis=1)
+    cumulative = [total]
+    for k in range(MAX_COUNT):
+        if (total >= 1.0 - TAIL_PROBABILITY).all():
+            break
+        pmf = pmf * np.where(poisson, mean, (k + r) * p) / (k + 1)
+        total = total + (share * pmf).sum(axis=1)
+        cumulative.append(total)
+    cumulative = np.column_stack(cumulative)
+
+    # Trimmed at the first value within TAIL_PROBABILITY of 1, which becomes 1
+    reached = cumulative >= 1.0 - TAIL_PROBABILITY
+    ends = np.where(reached.any(axis=1), np.argmax(reached, axis=1), cumulative.shape[1] - 1) + 1
+    for i, row in enumerate(live):
+        distribution = cumulative[i, :ends[i]].copy()
+        distribution[-1] = 1.0
+        distributions[row] = distribution
+    return distributions
+
+
+@timed("probability.distributions")
+def get_distributions(keys):
+    # keys: (athlete_id, stat, opponent, minutes); simulates the ones not cached
+    # yet, BATCH_SIZE players at a time. A player's stats share one minutes draw.
+    current = _current()
+    cache = current["distributions"]
+    missing = {}
+    for key in keys:
+        if key not in cache:
+            missing.setdefault(key[0], {})[key] = None
+    cache_result("probability.distributions", not missing)
+    if missing:
+        index = get_index()
+        athletes = list(missing)
+        with span("probability.simulate"):
+            for start in range(0, len(athletes), BATCH_SIZE):
+                batch = athletes[start:start + BATCH_SIZE]
+                minutes, counts = sample_minutes(index, batch, current["version"])
+                by_stat = {}
+                for i, athlete_id in enumerate(batch):
+                    for key in missing[athlete_id]:
+                        by_stat.setdefault(key[1], ([], []))
+                        by_stat[key[1]][0].append(key)
+                        by_stat[key[1]][1].append(i)
+                for stat, (stat_keys, rows) in by_stat.items():
+                    cache.update(zip(stat_keys, _simulate(index, stat, stat_keys, minutes[rows], counts[rows])))
+    return [cache[key] for key in keys]
+
+
+# ================================
+# Pricing
+# ================================
+def fair_odds(probability):
+    # American odds with no vig; NaN for certain or impossible outcomes
+    p = np.asarray(probability, dtype="float64")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        odds = np.where(p >= 0.5, -100 * p / (1 - p), 100 * (1 - p) / p)
+    return np.where((p > 0) & (p < 1), odds, np.nan)
+
+
+def price(distributions, lines):
+    # (P(over), P(push), P(under)) per line; NaN where there is no distribution
+    lines = np.asarray(lines, dtype="float64")
+    width = max((len(d) for d in distributions if d is not None), default=1)
+    cdf = np.ones((len(distributions), width + 1))
+    cdf[:, 0] = 0.0
+    known = np.zeros(len(distributions), dtype=bool)
+    for i, d in enumerate(distributions):
+        if d is not None:
+            cdf[i, 1:len(d) + 1] = d
+            known[i] = True
+
+    # cdf[:, k + 1] = P(X <= k) and cdf[:, 0] = P(X <= -1) = 0
+    rows = np.arange(len(lines))
+    below = np.clip(np.ceil(lines) - 1, -1, width - 1).astype(int) + 1
+    at_most = np.clip(np.floor(lines), -1, width - 1).astype(int) + 1
+    under = cdf[rows, below]
+    push = cdf[rows, at_most] - under
+    over = 1.0 - cdf[rows, at_most]
+    for probabilities in (over, push, under):
+        probabilities[~known] = np.nan
+    return over, push, under
+
+
+@timed("prop_probabilities")
+def prop_probabilities(athlete_ids, stats, lines, over_under, opponents=None, minutes=None):
+    # Per prop: win and push probability for its side and no-vig fair odds, as
+    # arrays. opponents: team names (see resolve_opponent); minutes: projected
+    # minutes, 0/NaN for the recent average.
+    n = len(athlete_ids)
+    opponents = [resolve_opponent(o) for o in opponents] if opponents is not None else [None] * n
+    minutes = [None if m is None or pd.isna(m) or m <= 0 else float(m) for m in minutes] \
+        if minutes is not None else [None] * n
+    keys = [
+        (int(a), stat, opponent, projected) if a is not None and stat in MODEL_STATS else None
+        for a, stat, opponent, projected in zip(athlete_ids, stats, opponents, minutes)
+    ]
+    simulated = [key for key in keys if key is not None]
+    simulated = dict(zip(simulated, get_distributions(simulated)))
+    distributions = [simulated.get(key) for key in keys]
+
+    over, push, under = price(distributions, lines)
+    is_over = np.asarray(over_under) == "over"
+    win = np.where(is_over, over, under)
+    lose = np.where(is_over, under, over)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        no_push = win / (win + lose)
+    return {"prob": win, "push": push, "fair_odds": fair_odds(no_push)}
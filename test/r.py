@@ -1,20 +1,32 @@
-import rpy2.robjects.packages as rpackages
-from rpy2.robjects.packages import importr
 import os
-import rpy2.robjects as robjects
-from sqlalchemy import create_engine
+import tempfile
+import pandas as pd
 
+# rpy2 starts an embedded R session on import, so it is only imported once a
+# refresh actually needs R
 
-engine = create_engine('sqlite:///:memory:')
+REQUIRED_PACKAGES = ["tictoc", "progressr", "wehoop"]
 
-def install_and_load():
-    utils = rpackages.importr("utils")
-    utils.install_packages("tictoc")
-    utils.install_packages("progressr")
-    utils.install_packages("wehoop")
 
-    output_path = os.path.expanduser("~/desktop/wnba_web/test/wnbaboxscore.csv")
+def ensure_packages():
+    # Only install what is missing; reinstalling on every refresh took minutes
+    import rpy2.robjects.packages as rpackages
+    from rpy2.robjects.vectors import StrVector
 
+    missing = [pkg for pkg in REQUIRED_PACKAGES if not rpackages.isinstalled(pkg)]
+    if missing:
+        utils = rpackages.importr("utils")
+        utils.install_packages(StrVector(missing))
+
+
+def load_player_box(output_path, season=None, since_date=None, last_season=None):
+    import rpy2.robjects as robjects
+
+    seasons_arg = f"seasons = {season}:{last_season or 'most_recent_wnba_season()'}" if season else ""
+    since_filter = ""
+    if since_date is not None:
+        # Keep the latest stored day too: games finishing late on that day may be missing
+        since_filter = f'wnba_player_box <- wnba_player_box[as.Date(wnba_player_box$game_date) >= as.Date("{since_date}"), ]'
 
     r_script = f"""
     library(tictoc)
@@ -23,11 +35,25 @@ def install_and_load():
 
     tic()
     with_progress({{
-        wnba_player_box <- load_wnba_player_box()
+        wnba_player_box <- load_wnba_player_box({seasons_arg})
     }})
+    {since_filter}
     toc()
 
     write.csv(wnba_player_box, "{output_path}", row.names = FALSE)
     """
 
     robjects.r(r_script)
+
+
+def fetch_player_box(since_date=None, season=None, last_season=None):
+    ensure_packages()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = os.path.join(tmp_dir, "wnba_player_box.csv")
+        load_player_box(tmp_path, season=season, since_date=since_date, last_season=last_season)
+        return pd.read_csv(tmp_path)
+
+
+def install_and_load(incremental=True):
+    from ingest import WehoopSource, run_ingest
+    return run_ingest(WehoopSource(), incremental=incremental)
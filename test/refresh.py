@@ -0,0 +1,43 @@
+import os
+
+import gamelog_index
+import matchups
+import rolling
+from boxscores import DATA_DIR, append_box_scores, iter_box_score_csv
+from metrics import timed
+
+# ================================
+# Incremental refresh
+# ================================
+# New box score rows are appended to the store and published as a new
+# snapshot whose tables are upserted for the new rows only (see snapshots.py).
+# The in-memory game log index is updated for the affected players only, as
+# long as it was built from the snapshot the rows were appended to.
+
+CLEANED_CSV = os.path.join(DATA_DIR, "wnba_box_scores_cleaned2.csv")
+
+
+@timed("refresh.apply_new_games")
+def apply_new_games(new_rows):
+    added, base_version, version = append_box_scores(new_rows)
+    if added.empty:
+        print("No new games to add.")
+        return added
+
+    gamelog_index.apply_new_games(added, base_version, version)
+    rolling.apply_new_games(added, base_version, version)
+    matchups.invalidate()
+
+    print(f"Added {len(added)} rows from {added['game_id'].nunique()} new games "
+          f"for {added['athlete_id'].nunique()} players.")
+    return added
+
+
+@timed("refresh.export_cleaned_csv")
+def export_cleaned_csv(path=CLEANED_CSV):
+    # Box scores (every CSV column) as every reader sees them, streamed chunk by
+    # chunk and written atomically
+    tmp_path = path + ".tmp"
+    for i, chunk in enumerate(iter_box_score_csv(columns=None)):
+        chunk.to_csv(tmp_path, mode="a" if i else "w", header=not i, index=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,125 @@
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from boxscores import load_latest_season
+from ingest import run_ingest
+from metrics import trace
+from refresh import export_cleaned_csv
+
+# ================================
+# Background data refresh
+# ================================
+# The refresh runs on a daemon thread so no request waits for the download.
+# Readers keep using the snapshot they already loaded; the new data is
+# swapped in by boxscores.append_box_scores() once it is complete.
+
+REFRESH_COOLDOWN_SECONDS = 15 * 60
+
+
+def last_game_date(df=None):
+    df = load_latest_season() if df is None else df
+    if df.empty:
+        return None
+    return df["game_date"].max().strftime("%Y-%m-%d")
+
+
+def is_stale(df=None):
+    yesterday = (datetime.today().date() - timedelta(days=1)).strftime("%Y-%m-%d")
+    last_date = last_game_date(df)
+    return last_date is None or last_date < yesterday
+
+
+class BackgroundRefresher:
+    def __init__(self, source=None):
+        self.source = source
+        self.state = "idle"
+        self.last_started = None
+        self.last_finished = None
+        self.last_error = None
+        self.last_rows_added = None
+        self.last_trace = None
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._interval = None
+
+    def start(self, interval_seconds=None):
+        # interval_seconds: also check for stale data on this schedule
+        with self._lock:
+            self._interval = interval_seconds
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="wnba-refresh", daemon=True)
+                self._thread.start()
+        return self
+
+    def request_refresh(self, cooldown_seconds=REFRESH_COOLDOWN_SECONDS):
+        # Returns False when a refresh is already queued/running or finished
+        # within the cooldown (e.g. no games were played yesterday)
+        with self._lock:
+            if self.state != "idle":
+                return False
+            if self.last_finished is not None and cooldown_seconds:
+                if (datetime.now() - self.last_finished).total_seconds() < cooldown_seconds:
+                    return False
+            self.state = "queued"
+        self.start(self._interval)
+        self._wake.set()
+        return True
+
+    def status(self):
+        return {
+            "state": self.state,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_error": self.last_error,
+            "last_rows_added": self.last_rows_added,
+            "last_trace": self.last_trace,
+        }
+
+    def _loop(self):
+        while True:
+            woken = self._wake.wait(self._interval)
+            self._wake.clear()
+            if woken:
+                self._refresh()
+            elif is_stale():
+                self.request_refresh()
+
+    def _refresh(self):
+        with self._lock:
+            self.state = "refreshing"
+            self.last_started = datetime.now()
+        try:
+            with trace("refresh") as refresh_trace:
+                added = run_ingest(self.source)
+                export_cleaned_csv()
+            self.last_trace = refresh_trace
+            self.last_rows_added = 0 if added is None else len(added)
+            self.last_error = None
+        except Exception:
+            self.last_error = traceback.format_exc()
+            print(f"❌ Background refresh failed:\n{self.last_error}")
+        finally:
+            with self._lock:
+                self.state = "idle"
+                self.last_finished = datetime.now()
+
+
+_refresher = BackgroundRefresher()
+
+
+def get_refresher():
+    return _refresher
+
+
+def wait_until_idle(timeout=None):
+    # For the CLI and scripts that want to block on a refresh they started
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _refresher.state != "idle":
+        if deadline is not None and time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
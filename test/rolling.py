@@ -0,0 +1,158 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from gamelog_index import COMBO_STATS, INDEX_STATS, get_index
+from metrics import cache_result, span, timed
+
+# ================================
+# Rolling-window stat engine
+# ================================
+# Works on the game log index's players x games matrices (most recent game in
+# column 0). One cumulative sum per stat along the games axis gives the sum,
+# sum of squares and games played for ANY last-N window of EVERY player as a
+# single column read. Medians need the raw window and are computed per window.
+
+WINDOWS = {"L5": 5, "L10": 10, "L20": 20, "season": None}
+ROLLING_STATS = INDEX_STATS + list(COMBO_STATS)
+
+_cached = {"engine": None}
+
+
+def _window_column(width, n):
+    # Last column of a last-n window; -1 when there are no games at all
+    return (width if n is None else min(n, width)) - 1
+
+
+class RollingStats:
+    def __init__(self, index, summary=None):
+        self.index = index
+        self._cumulative = {}
+        self._summary = summary
+
+    def _cumulative_sums(self, stat):
+        if stat not in self._cumulative:
+            matrix = self.index.stat_matrix(stat)
+            played = ~np.isnan(matrix)
+            values = np.where(played, matrix, 0.0)
+            self._cumulative[stat] = (
+                np.cumsum(values, axis=1),
+                np.cumsum(values * values, axis=1),
+                np.cumsum(played, axis=1),
+            )
+        return self._cumulative[stat]
+
+    def _rows(self, athlete_ids):
+        if athlete_ids is None:
+            return np.arange(len(self.index.athlete_ids))
+        rows = self.index.positions(athlete_ids)
+        if (rows < 0).any():
+            raise ValueError(f"Unknown athlete_id: {np.asarray(athlete_ids)[rows < 0].tolist()}")
+        return rows
+
+    def window(self, stat, n=None, athlete_ids=None):
+        # (sum, sum of squares, games played) over each player's last n games
+        rows = self._rows(athlete_ids)
+        cum_sum, cum_sq, cum_count = self._cumulative_sums(stat)
+        col = _window_column(cum_sum.shape[1], n)
+        if col < 0:
+            zeros = np.zeros(len(rows))
+            return zeros, zeros, zeros
+        return cum_sum[rows, col], cum_sq[rows, col], cum_count[rows, col]
+
+    def means(self, stat, n=None, athlete_ids=None):
+        total, _, count = self.window(stat, n, athlete_ids)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total / count
+
+    def stds(self, stat, n=None, athlete_ids=None):
+        # Sample standard deviation; NaN with fewer than two games played
+        total, total_sq, count = self.window(stat, n, athlete_ids)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (total_sq - total * total / count) / (count - 1)
+        return np.sqrt(np.clip(variance, 0.0, None))
+
+    def medians(self, stat, n=None, athlete_ids=None):
+        matrix = self.index.stat_matrix(stat)[self._rows(athlete_ids), :n]
+        if matrix.shape[1] == 0:
+            return np.full(matrix.shape[0], np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanmedian(matrix, axis=1)
+
+    def hit_rates(self, stat, line, over_under="over", windows=WINDOWS, athlete_ids=None):
+        # Games in the window are game rows (DNPs count, as in betting_line)
+        rows = self._rows(athlete_ids)
+        matrix = self.index.stat_matrix(stat)[rows]
+        hits = matrix > line if over_under == "over" else matrix < line
+        cum_hits = np.cumsum(hits, axis=1)
+        game_counts = self.index.game_counts[rows]
+
+        result = pd.DataFrame(index=pd.Index(self.index.athlete_ids[rows], name="athlete_id"))
+        for name, n in windows.items():
+            col = _window_column(cum_hits.shape[1], n)
+            window_hits = cum_hits[:, col] if col >= 0 else np.zeros(len(rows))
+            window_games = game_counts if n is None else np.minimum(game_counts, n)
+            result[f"{name}_hits"] = window_hits
+            result[f"{name}_games"] = window_games
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[f"{name}_rate"] = window_hits / window_games
+        return result
+
+    def compute_summary(self, athlete_ids=None, stats=ROLLING_STATS, windows=WINDOWS):
+        rows = self._rows(athlete_ids)
+        columns = {}
+        for stat in stats:
+            for name, n in windows.items():
+                _, _, count = self.window(stat, n, athlete_ids)
+                columns[f"{stat}_{name}_games"] = count
+                columns[f"{stat}_{name}_mean"] = self.means(stat, n, athlete_ids)
+                columns[f"{stat}_{name}_median"] = self.medians(stat, n, athlete_ids)
+                columns[f"{stat}_{name}_std"] = self.stds(stat, n, athlete_ids)
+        return pd.DataFrame(columns, index=pd.Index(self.index.athlete_ids[rows], name="athlete_id"))
+
+    def summary(self):
+        # Every player x stat x window x measure, computed once per index
+        cache_result("rolling.summary", self._summary is not None)
+        if self._summary is None:
+            with span("rolling.compute_summary"):
+                self._summary = self.compute_summary()
+        return self._summary
+
+    def averages(self, athlete_id, n=None, stats=ROLLING_STATS):
+        return {stat: float(self.means(stat, n, [athlete_id])[0]) for stat in stats}
+
+    def with_index(self, index, athlete_ids):
+        # Engine for an updated index: only the given players' summary rows are recomputed
+        engine = RollingStats(index)
+        if self._summary is not None:
+            athlete_ids = [a for a in athlete_ids if index.game_count(a) > 0]
+            updated = engine.compute_summary(athlete_ids)
+            kept = self._summary.drop(index=updated.index, errors="ignore")
+            engine._summary = pd.concat([kept, updated]).sort_index()
+        return engine
+
+
+def get_rolling():
+    index = get_index()
+    engine = _cached["engine"]
+    if engine is None or engine.index is not index:
+        engine = RollingStats(index)
+        _cached["engine"] = engine
+    return engine
+
+
+@timed("rolling.apply_new_games")
+def apply_new_games(new_rows, base_version, version):
+    # Call after gamelog_index.apply_new_games(). Only an engine over the index
+    # of base_version is carried over to the index of `version`; any other one
+    # is left for get_rolling() to rebuild.
+    engine = _cached["engine"]
+    index = get_index()
+    if engine is None or engine.index is index:
+        return
+    if engine.index.version != base_version or index.version != version:
+        _cached["engine"] = None
+        return
+    _cached["engine"] = engine.with_index(index, new_rows["athlete_id"].unique())
@@ -0,0 +1,142 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from gamelog_index import PROP_STATS, get_index
+from metrics import timed
+from names import get_resolver
+from probability import prop_probabilities, resolve_opponent
+
+# ================================
+# Batch prop evaluation for a whole slate
+# ================================
+# Each prop is a (player, stat, line, over/under) row. Props are grouped by
+# stat and evaluated against the index's players x games matrix in one pass,
+# so a slate of hundreds of props costs a handful of array operations.
+# Optional opponent and minutes columns feed the model probability and fair
+# odds (see probability.py).
+
+SLATE_WINDOWS = {"l5": 5, "l10": 10, "season": None}
+SLATE_COLUMNS = ["player", "stat", "line", "over_under"]
+
+
+def read_props(props):
+    if isinstance(props, pd.DataFrame):
+        df = props.copy()
+    else:
+        df = pd.read_csv(props)
+
+    df.columns = [c.strip().lower() for c in df.columns]
+    df = df.rename(columns={"side": "over_under", "player_name": "player"})
+    missing = [c for c in SLATE_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Props are missing columns: {missing}")
+
+    df["player"] = df["player"].astype(str).str.strip()
+    df["stat"] = df["stat"].astype(str).str.strip()
+    df["over_under"] = df["over_under"].astype(str).str.strip().str.lower()
+    df["line"] = pd.to_numeric(df["line"], errors="raise")
+
+    bad_stats = set(df["stat"]) - set(PROP_STATS)
+    if bad_stats:
+        raise ValueError(f"Invalid stat: {sorted(bad_stats)}")
+    bad_sides = set(df["over_under"]) - {"over", "under"}
+    if bad_sides:
+        raise ValueError(f"Invalid over/under: {sorted(bad_sides)}")
+    df["opponent"] = [resolve_opponent(o) for o in df["opponent"]] if "opponent" in df else None
+    df["minutes"] = pd.to_numeric(df["minutes"], errors="raise") if "minutes" in df else np.nan
+    return df.reset_index(drop=True)
+
+
+@timed("evaluate_slate")
+def evaluate_slate(props):
+    df = read_props(props)
+    index = get_index()
+
+    resolver = get_resolver()
+    athlete_ids = [resolver.resolve(p) for p in df["player"]]
+    df["athlete_id"] = pd.array(athlete_ids, dtype="Int64")
+    df["resolved_player"] = [resolver.name(a) for a in athlete_ids]
+    rows = index.positions(athlete_ids)
+    found = rows >= 0
+
+    games = np.where(found, index.game_counts[np.maximum(rows, 0)], 0)
+    df["games"] = games
+
+    results = {}
+    for name in SLATE_WINDOWS:
+        for col in ("hits", "games", "hit_rate", "avg"):
+            results[f"{col}_{name}"] = np.full(len(df), np.nan)
+
+    lines = df["line"].to_numpy(dtype="float64")
+    is_over = (df["over_under"] == "over").to_numpy()
+
+    for stat, prop_idx in df.groupby("stat").indices.items():
+        prop_idx = prop_idx[found[prop_idx]]
+        if len(prop_idx) == 0:
+            continue
+
+        values = index.stat_matrix(stat)[rows[prop_idx]]
+        line = lines[prop_idx, None]
+        hits = np.where(is_over[prop_idx, None], values > line, values < line)
+        played = ~np.isnan(values)
+
+        for name, window in SLATE_WINDOWS.items():
+            cut = slice(None, window)
+            window_games = np.minimum(games[prop_idx], window) if window else games[prop_idx]
+            window_hits = hits[:, cut].sum(axis=1)
+            stat_count = played[:, cut].sum(axis=1)
+            stat_sum = np.where(played[:, cut], values[:, cut], 0.0).sum(axis=1)
+
+            results[f"hits_{name}"][prop_idx] = window_hits
+            results[f"games_{name}"][prop_idx] = window_games
+            with np.errstate(invalid="ignore", divide="ignore"):
+                results[f"hit_rate_{name}"][prop_idx] = window_hits / window_games
+                results[f"avg_{name}"][prop_idx] = stat_sum / stat_count
+
+    results.update(prop_probabilities(athlete_ids, df["stat"], lines, df["over_under"], df["opponent"], df["minutes"]))
+    for col, values in results.items():
+        df[col] = values
+    return df
+
+
+@timed("evaluate_prop")
+def evaluate_prop(athlete_id, stat, line, over_under="over", opponent=None, minutes=None):
+    # One prop for an already resolved player, same fields as evaluate_slate()
+    # without the DataFrame overhead
+    if stat not in PROP_STATS:
+        raise ValueError(f"Invalid stat: {stat}")
+    if over_under not in ("over", "under"):
+        raise ValueError(f"Invalid over/under: {over_under}")
+
+    index = get_index()
+    values = index.values(athlete_id, stat)
+    hits = values > line if over_under == "over" else values < line
+    result = {"athlete_id": athlete_id, "player": index.player_names.get(athlete_id), "stat": stat,
+              "line": line, "over_under": over_under, "games": len(values)}
+    for name, window in SLATE_WINDOWS.items():
+        window_values = values[:window]
+        played = window_values[~np.isnan(window_values)]
+        window_hits = int(hits[:window].sum())
+        result[f"hits_{name}"] = window_hits
+        result[f"games_{name}"] = len(window_values)
+        result[f"hit_rate_{name}"] = window_hits / len(window_values) if len(window_values) else None
+        result[f"avg_{name}"] = float(played.mean()) if len(played) else None
+
+    result["opponent"] = opponent = resolve_opponent(opponent)
+    model = prop_probabilities([athlete_id], [stat], [line], [over_under], [opponent], [minutes])
+    result.update({col: None if np.isnan(values[0]) else float(values[0]) for col, values in model.items()})
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python slate.py props.csv [output.csv]")
+        sys.exit(1)
+
+    slate = evaluate_slate(sys.argv[1])
+    if len(sys.argv) > 2:
+        slate.to_csv(sys.argv[2], index=False)
+    else:
+        print(slate.to_string(index=False))
@@ -0,0 +1,271 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from metrics import cache_result, span, timed
+
+# ================================
+# Versioned, immutable data snapshots
+# ================================
+# Each ingest publishes a new directory snapshots/<version>/ holding the typed
+# box scores (boxscores.feather), the team/player dimension tables
+# (<name>.feather, see boxscores.py), the players/games database (wnba.db,
+# see db.py) and its publish time (snapshot.json).
+# The box score file holds one record batch per season, listed in its schema
+# metadata, so a query for some seasons maps only those batches.
+# A snapshot is never modified after publish. The CURRENT pointer file is
+# swapped with os.replace, so readers see either the old or the new version.
+# A reader that pins a snapshot keeps using it until it is done, even if a
+# newer one is published meanwhile.
+
+# WNBA_DATA_DIR points the store somewhere else (benchmarks, scratch copies)
+DATA_DIR = os.environ.get("WNBA_DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+POINTER_PATH = os.path.join(SNAPSHOT_DIR, "CURRENT")
+BOX_SCORE_FILE = "boxscores.feather"
+DATABASE_FILE = "wnba.db"
+METADATA_FILE = "snapshot.json"
+
+# Part of every snapshot version; bump when the files or the database schema change
+FORMAT_VERSION = "f8"
+KEEP_SNAPSHOTS = 3
+# Other processes may still be reading an old version; give them time to finish
+GC_GRACE_SECONDS = 10 * 60
+
+_lock = threading.RLock()
+_snapshots = {}
+_pinned = threading.local()
+# (stat key, parsed pointer) of the CURRENT file last read or written
+_pointer = {"entry": (None, None)}
+
+
+class Snapshot:
+    def __init__(self, version):
+        self.version = version
+        self.path = os.path.join(SNAPSHOT_DIR, version)
+        self.box_score_path = os.path.join(self.path, BOX_SCORE_FILE)
+        self.database_path = os.path.join(self.path, DATABASE_FILE)
+        self.metadata_path = os.path.join(self.path, METADATA_FILE)
+        self.readers = 0
+        self._metadata = None
+        self._frame = None
+        self._season_frames = {}
+        self._dimensions = {}
+        self._engine = None
+
+    def seasons(self):
+        # Seasons stored in this snapshot, one record batch each, oldest first
+        with pa.memory_map(self.box_score_path) as source:
+            return json.loads(pa.ipc.open_file(source).schema.metadata[b"seasons"])
+
+    def published_at(self):
+        # Unix time the snapshot was built at. Unlike the directory's mtime it
+        # never moves after publish.
+        if self._metadata is None:
+            with open(self.metadata_path) as f:
+                self._metadata = json.load(f)
+        return self._metadata["published_at"]
+
+    def frame(self, seasons=None):
+        if seasons is not None:
+            return self._season_frame(tuple(sorted(seasons)))
+        cache_result("snapshot.frame", self._frame is not None)
+        if self._frame is None:
+            # Uncompressed Feather: memory-mapped, no decode step
+            with span("snapshot.frame_load"):
+                self._frame = feather.read_table(self.box_score_path, memory_map=True).to_pandas()
+        return self._frame
+
+    def _season_frame(self, seasons):
+        # Partition pruning: only the requested seasons' batches are read
+        cache_result("snapshot.season_frame", seasons in self._season_frames)
+        if seasons not in self._season_frames:
+            with span("snapshot.season_frame_load"), pa.memory_map(self.box_score_path) as source:
+                reader = pa.ipc.open_file(source)
+                stored = json.loads(reader.schema.metadata[b"seasons"])
+                batches = [reader.get_batch(i) for i, season in enumerate(stored) if season in seasons]
+                self._season_frames[seasons] = pa.Table.from_batches(batches, reader.schema).to_pandas()
+        return self._season_frames[seasons]
+
+    def dimension(self, name):
+        cache_result("snapshot.dimension", name in self._dimensions)
+        if name not in self._dimensions:
+            path = os.path.join(self.path, f"{name}.feather")
+            self._dimensions[name] = feather.read_table(path, memory_map=True).to_pandas()
+        return self._dimensions[name]
+
+    def engine(self):
+        if self._engine is None:
+            from db import create_reader_engine
+            self._engine = create_reader_engine(self.database_path)
+        return self._engine
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.dispose()
+        self._engine = None
+        self._frame = None
+        self._season_frames = {}
+        self._dimensions = {}
+
+
+def after_fork():
+    # A forked child must not reuse the parent's pooled SQLite connections
+    with _lock:
+        for snapshot in _snapshots.values():
+            if snapshot._engine is not None:
+                snapshot._engine.dispose(close=False)
+
+
+def _pointer_key(stat):
+    # os.replace gives the file a new inode and mtime on every swap
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def read_pointer():
+    # Parsed again only when the file was swapped since the last read; callers
+    # must not modify the returned dict
+    try:
+        key = _pointer_key(os.stat(POINTER_PATH))
+        cached_key, pointer = _pointer["entry"]
+        if cached_key != key:
+            with open(POINTER_PATH) as f:
+                pointer = json.load(f)
+            _pointer["entry"] = (key, pointer)
+        return pointer
+    except (OSError, ValueError):
+        return None
+
+
+def write_pointer(pointer):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = f"{POINTER_PATH}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        json.dump(pointer, f)
+    key = _pointer_key(os.stat(tmp_path))
+    os.replace(tmp_path, POINTER_PATH)
+    _pointer["entry"] = (key, dict(pointer))
+
+
+def get_snapshot(version):
+    with _lock:
+        if version not in _snapshots:
+            _snapshots[version] = Snapshot(version)
+        return _snapshots[version]
+
+
+def pinned_snapshot():
+    return getattr(_pinned, "snapshot", None)
+
+
+def current_snapshot():
+    pinned = pinned_snapshot()
+    if pinned is not None:
+        return pinned
+    pointer = read_pointer()
+    if pointer is None:
+        return None
+    return get_snapshot(pointer["version"])
+
+
+@contextmanager
+def pin(snapshot=None):
+    # Every current_snapshot() call on this thread returns the same version
+    # until the block exits; garbage collection skips pinned versions.
+    snapshot = snapshot or current_snapshot()
+    previous = pinned_snapshot()
+    with _lock:
+        snapshot.readers += 1
+    _pinned.snapshot = snapshot
+    try:
+        yield snapshot
+    finally:
+        _pinned.snapshot = previous
+        with _lock:
+            snapshot.readers -= 1
+
+
+def write_box_score_file(df, path):
+    # One record batch per season (see Snapshot.frame); categoricals keep one
+    # dictionary for the whole file
+    df = df.sort_values("season", kind="stable")
+    seasons = [int(season) for season in df["season"].unique()]
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    schema = schema.with_metadata({**schema.metadata, b"seasons": json.dumps(seasons).encode()})
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for _, part in df.groupby("season", sort=True):
+            writer.write_batch(pa.RecordBatch.from_pandas(part, schema=schema, preserve_index=False))
+
+
+@timed("snapshot.publish")
+def publish(df, pointer, added=None, dimensions=None, tables=None):
+    # Writes snapshots/<version>/ (unless it already exists) and flips CURRENT.
+    # With `added`, the previous snapshot's database is copied and only those
+    # rows are upserted instead of rebuilding every table. `tables` are
+    # prebuilt rows for a full build (see db.table_rows).
+    from db import close_writer_engine, create_tables, create_writer_engine, upsert_tables
+
+    version = pointer["version"]
+    snapshot = get_snapshot(version)
+    previous = current_snapshot()
+
+    if not os.path.isdir(snapshot.path):
+        tmp_dir = f"{snapshot.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp_dir)
+        write_box_score_file(df, os.path.join(tmp_dir, BOX_SCORE_FILE))
+        for name, table in (dimensions or {}).items():
+            feather.write_feather(table, os.path.join(tmp_dir, f"{name}.feather"), compression="uncompressed")
+
+        tmp_database = os.path.join(tmp_dir, DATABASE_FILE)
+        engine = create_writer_engine(tmp_database)
+        reusable = previous is not None and previous.version.endswith(FORMAT_VERSION)
+        if added is not None and reusable and os.path.exists(previous.database_path):
+            shutil.copyfile(previous.database_path, tmp_database)
+            upsert_tables(engine, added)
+        else:
+            create_tables(engine, df, tables)
+        close_writer_engine(engine)
+        with open(os.path.join(tmp_dir, METADATA_FILE), "w") as f:
+            json.dump({"version": version, "published_at": time.time()}, f)
+
+        try:
+            os.rename(tmp_dir, snapshot.path)
+        except OSError:
+            # Another process published the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    write_pointer(pointer)
+    collect_garbage()
+    return snapshot
+
+
+def collect_garbage(keep=KEEP_SNAPSHOTS):
+    pointer = read_pointer()
+    current = pointer["version"] if pointer else None
+    try:
+        entries = [e for e in os.scandir(SNAPSHOT_DIR) if e.is_dir()]
+    except OSError:
+        return
+
+    now = time.time()
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for i, entry in enumerate(entries):
+        in_progress = ".tmp-" in entry.name
+        if entry.name == current or (i < keep and not in_progress):
+            continue
+        if now - entry.stat().st_mtime < GC_GRACE_SECONDS:
+            continue
+        with _lock:
+            snapshot = _snapshots.get(entry.name)
+            if snapshot is not None and snapshot.readers > 0:
+                continue
+            if snapshot is not None:
+                snapshot.close()
+                del _snapshots[entry.name]
+        shutil.rmtree(entry.path, ignore_errors=True)
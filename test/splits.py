@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from boxscores import data_version, load_box_scores
+from gamelog_index import COMBO_STATS
+from metrics import cache_result, span, timed
+
+# ================================
+# Situational split cube
+# ================================
+# Every game a player played (DNP and zero-minute rows are left out) is placed
+# in one cell per split dimension (home/away, starter/bench, days of rest since
+# the previous game played, win/loss, opponent). Cells are laid out one
+# dimension after another, each as players x values, and each stat's values
+# are stored sorted within their cell (missing values last, e.g. 3P% without
+# an attempt), with the cell offsets as in the game log index. Built once per
+# data version in one pass, so a player's split of any prop is a few slices
+# and binary searches.
+
+# Fixed dimension values; opponents come from the data
+SPLITS = {
+    "home_away": ["home", "away"],
+    "starter": ["starter", "bench"],
+    "rest": ["0 days", "1 day", "2 days", "3+ days"],
+    "result": ["win", "loss"],
+}
+SPLIT_DIMENSIONS = list(SPLITS) + ["opponent"]
+SPLIT_LABELS = {
+    "home": "at home", "away": "on the road", "starter": "as a starter", "bench": "off the bench",
+    "0 days": "on 0 days rest", "1 day": "on 1 day rest", "2 days": "on 2 days rest", "3+ days": "on 3+ days rest",
+    "win": "in wins", "loss": "in losses",
+}
+
+_cached = {"version": None, "cube": None}
+
+
+def stat_values(df):
+    # {stat: float values per row} under the game log index's stat names
+    values = {
+        col: df[col].to_numpy(dtype="float64", na_value=np.nan)
+        for col in ["minutes", "points", "rebounds", "assists", "three_point_field_goals_attempted"]
+    }
+    values["three_pointers_made"] = df["three_point_field_goals_made"].to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values["three_points_percentage"] = values["three_pointers_made"] / values.pop("three_point_field_goals_attempted")
+    for combo, parts in COMBO_STATS.items():
+        values[combo] = sum(values[part] for part in parts)
+    return values
+
+
+def split_codes(df):
+    # {dimension: (values, code of each row's value)}; rows are played games,
+    # sorted by player and date
+    dates = df["game_date"].to_numpy()
+    athletes = df["athlete_id"].to_numpy()
+    # Days off since the player's previous game played; a first game counts as well rested
+    rest = (dates[1:] - dates[:-1]) // np.timedelta64(1, "D") - 1
+    rest = np.where(athletes[1:] == athletes[:-1], rest, 3)
+    opponents = df["opponent_team_name"].astype(str)
+    teams = sorted(opponents.unique())
+    return {
+        "home_away": (SPLITS["home_away"], (df["home_away"] == "away").to_numpy().astype("int64")),
+        "starter": (SPLITS["starter"], (~df["starter"].to_numpy()).astype("int64")),
+        "rest": (SPLITS["rest"], np.clip(np.append(3, rest), 0, 3)),
+        "result": (SPLITS["result"], (~df["team_winner"].to_numpy()).astype("int64")),
+        "opponent": (teams, np.searchsorted(teams, opponents.to_numpy())),
+    }
+
+
+def split_label(dimension, value):
+    return f"against {value}" if dimension == "opponent" else SPLIT_LABELS.get(value, value)
+
+
+class SplitCube:
+    def __init__(self, df, version=None):
+        self.version = version
+        df = df[df["minutes"].to_numpy(dtype="float64", na_value=0) > 0].sort_values(["athlete_id", "game_date"], kind="stable")
+        self.athlete_ids, player_rows = np.unique(df["athlete_id"].to_numpy(), return_inverse=True)
+        self._position = {int(a): i for i, a in enumerate(self.athlete_ids)}
+
+        # Cell of every (row, dimension) pair
+        self.dimensions = {}
+        base = 0
+        cells = []
+        for dimension, (values, codes) in split_codes(df).items():
+            self.dimensions[dimension] = (base, list(values))
+            cells.append(base + player_rows * len(values) + codes)
+            base += len(self.athlete_ids) * len(values)
+        cells = np.concatenate(cells)
+        rows = np.tile(np.arange(len(df)), len(self.dimensions))
+
+        self.games = np.bincount(cells, minlength=base)
+        self.offsets = np.append(0, np.cumsum(self.games))
+        self.sorted_values, self.played, self.sums = {}, {}, {}
+        for stat, values in stat_values(df).items():
+            values = values[rows]
+            played = ~np.isnan(values)
+            self.sorted_values[stat] = values[np.lexsort((values, cells))]
+            self.played[stat] = np.bincount(cells[played], minlength=base)
+            self.sums[stat] = np.bincount(cells[played], weights=values[played], minlength=base)
+
+    def cells(self, athlete_id, dimension):
+        # (cell of each of the dimension's values, values) for one player
+        base, values = self.dimensions[dimension]
+        i = self._position.get(athlete_id)
+        if i is None:
+            return np.zeros(0, dtype="int64"), []
+        return base + i * len(values) + np.arange(len(values)), values
+
+    def values(self, athlete_id, dimension, value, stat):
+        # Played games' values of one cell, ascending
+        cells, values = self.cells(athlete_id, dimension)
+        if value not in values:
+            return np.zeros(0)
+        cell = cells[values.index(value)]
+        start = self.offsets[cell]
+        return self.sorted_values[stat][start:start + self.played[stat][cell]]
+
+    def _hits(self, stat, cell, line, over_under):
+        # Played games of a cell over (or under) the line
+        start, played = self.offsets[cell], self.played[stat][cell]
+        ordered = self.sorted_values[stat][start:start + played]
+        if over_under == "over":
+            return int(played - np.searchsorted(ordered, line, side="right"))
+        return int(np.searchsorted(ordered, line, side="left"))
+
+    def _check(self, stat, over_under):
+        if stat not in self.sorted_values:
+            raise ValueError(f"Invalid stat: {stat}")
+        if over_under not in ("over", "under"):
+            raise ValueError(f"Invalid over/under: {over_under}")
+
+    def split(self, athlete_id, stat, line=None, over_under="over", dimensions=SPLIT_DIMENSIONS):
+        # One row per (dimension, value) the player has played games in; hit
+        # rates are over those games
+        self._check(stat, over_under)
+        rows = []
+        for dimension in dimensions:
+            cells, values = self.cells(athlete_id, dimension)
+            for cell, value in zip(cells, values):
+                games = int(self.games[cell])
+                if not games:
+                    continue
+                played = int(self.played[stat][cell])
+                row = {"dimension": dimension, "split": value, "games": games, "played": played,
+                       "avg": self.sums[stat][cell] / played if played else np.nan}
+                if line is not None:
+                    row["hits"] = self._hits(stat, cell, line, over_under)
+                    row["hit_rate"] = row["hits"] / games
+                rows.append(row)
+        columns = ["dimension", "split", "games", "played", "avg"] + (["hits", "hit_rate"] if line is not None else [])
+        return pd.DataFrame(rows, columns=columns)
+
+    def hit_counts(self, athlete_id, stat, line, over_under="over", dimensions=SPLIT_DIMENSIONS):
+        # split()'s (dimension, split, hits, games) as plain tuples, for callers
+        # that only format them
+        self._check(stat, over_under)
+        rows = []
+        for dimension in dimensions:
+            cells, values = self.cells(athlete_id, dimension)
+            for cell, value in zip(cells.tolist(), values):
+                games = int(self.games[cell])
+                if games:
+                    rows.append((dimension, value, self._hits(stat, cell, line, over_under), games))
+        return rows
+
+    def averages(self, athlete_id, stats=("minutes", "points", "rebounds", "assists", "three_pointers_made"),
+                 dimensions=SPLIT_DIMENSIONS):
+        # Games and per-game averages of several stats, one row per (dimension, value)
+        table = None
+        for stat in stats:
+            split = self.split(athlete_id, stat, dimensions=dimensions).set_index(["dimension", "split"])
+            if table is None:
+                table = split[["games"]].copy()
+            table[stat] = split["avg"]
+        return table
+
+
+def get_splits():
+    version = data_version()
+    cache_result("splits", _cached["version"] == version)
+    if _cached["version"] != version:
+        df = load_box_scores()
+        with span("splits.build"):
+            _cached["cube"] = SplitCube(df, version)
+        _cached["version"] = version
+    return _cached["cube"]
+
+
+@timed("splits.split")
+def player_splits(athlete_id, stat, line=None, over_under="over", dimensions=SPLIT_DIMENSIONS):
+    return get_splits().split(athlete_id, stat, line, over_under, dimensions)
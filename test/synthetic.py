@@ -0,0 +1,272 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# ================================
+# Synthetic box score generator
+# ================================
+# Produces box scores in the exact 57-column layout of wnbaboxscore.csv for
+# any number of seasons, teams and players, so the pipeline can be timed at
+# sizes the real data does not reach yet. Everything is generated per season
+# with array operations; a few million rows take seconds.
+
+BOX_SCORE_COLUMNS = [
+    "game_id", "season", "season_type", "game_date", "game_date_time", "athlete_id", "athlete_display_name",
+    "team_id", "team_name", "team_location", "team_short_display_name", "minutes", "field_goals_made",
+    "field_goals_attempted", "three_point_field_goals_made", "three_point_field_goals_attempted",
+    "free_throws_made", "free_throws_attempted", "offensive_rebounds", "defensive_rebounds", "rebounds",
+    "assists", "steals", "blocks", "turnovers", "fouls", "plus_minus", "points", "starter", "ejected",
+    "did_not_play", "reason", "active", "athlete_jersey", "athlete_short_name", "athlete_headshot_href",
+    "athlete_position_name", "athlete_position_abbreviation", "team_display_name", "team_uid", "team_slug",
+    "team_logo", "team_abbreviation", "team_color", "team_alternate_color", "home_away", "team_winner",
+    "team_score", "opponent_team_id", "opponent_team_name", "opponent_team_location",
+    "opponent_team_display_name", "opponent_team_abbreviation", "opponent_team_logo", "opponent_team_color",
+    "opponent_team_alternate_color", "opponent_team_score",
+]
+
+# team_id, location, name, abbreviation, color, alternate color
+TEAMS = [
+    (3, "Dallas", "Wings", "DAL", "002b5c", "c4d600"),
+    (5, "Indiana", "Fever", "IND", "002d62", "e03a3e"),
+    (6, "Los Angeles", "Sparks", "LA", "552583", "fdb927"),
+    (8, "Minnesota", "Lynx", "MIN", "266092", "79bc43"),
+    (9, "New York", "Liberty", "NY", "86cebc", "000000"),
+    (11, "Phoenix", "Mercury", "PHX", "3c286e", "e56020"),
+    (14, "Seattle", "Storm", "SEA", "2c5235", "fee11a"),
+    (16, "Washington", "Mystics", "WSH", "e03a3e", "002b5c"),
+    (17, "Las Vegas", "Aces", "LV", "a7a8aa", "000000"),
+    (18, "Connecticut", "Sun", "CONN", "f05023", "0a2240"),
+    (19, "Chicago", "Sky", "CHI", "5091cd", "ffd520"),
+    (20, "Atlanta", "Dream", "ATL", "e31837", "5091cc"),
+    (129689, "Golden State", "Valkyries", "GS", "b38fcf", "000000"),
+]
+FIRST_NAMES = ["Aaliyah", "Brianna", "Caitlin", "Diamond", "Erica", "Gabby", "Haley", "Jackie", "Kayla",
+               "Lexie", "Marina", "Natasha", "Olivia", "Paige", "Rhyne", "Sabrina", "Tiffany", "Veronica"]
+LAST_NAMES = ["Allen", "Brown", "Carter", "Davis", "Evans", "Fowles", "Gray", "Howard", "Jones", "Kelly",
+              "Lewis", "Moore", "Nelson", "Ogunbowale", "Parker", "Robinson", "Smith", "Taylor", "Young"]
+POSITIONS = np.array(["G", "F", "C"])
+POSITION_NAMES = {"G": "Guard", "F": "Forward", "C": "Center"}
+POSITION_SHARE = [0.45, 0.4, 0.15]
+# Per-36 base rates by position: rebounds, assists, steals, blocks, share of shots from three
+POSITION_RATES = {
+    "G": (4.0, 5.0, 1.4, 0.3, 0.45),
+    "F": (7.0, 2.5, 1.1, 0.7, 0.30),
+    "C": (10.0, 1.8, 0.8, 1.6, 0.08),
+}
+STARTERS = 5
+REGULAR_SEASON = 2
+PLAYOFFS = 3
+SEASON_START = "05-16"
+
+
+def _teams(n_teams):
+    rows = list(TEAMS[:n_teams])
+    for i in range(len(rows), n_teams):
+        rows.append((200000 + i, f"Expansion {i}", f"Team{i}", f"X{i}", "333333", "cccccc"))
+    teams = pd.DataFrame(rows, columns=["team_id", "team_location", "team_name", "team_abbreviation",
+                                        "team_color", "team_alternate_color"])
+    teams["team_display_name"] = teams["team_location"] + " " + teams["team_name"]
+    teams["team_short_display_name"] = teams["team_name"]
+    teams["team_slug"] = teams["team_display_name"].str.lower().str.replace(" ", "-")
+    teams["team_uid"] = "s:40~l:59~t:" + teams["team_id"].astype(str)
+    teams["team_logo"] = ("https://a.espncdn.com/i/teamlogos/wnba/500/"
+                          + teams["team_abbreviation"].str.lower() + ".png")
+    return teams
+
+
+def _new_players(rng, count, next_id):
+    first = rng.choice(FIRST_NAMES, count)
+    last = rng.choice(LAST_NAMES, count)
+    position = rng.choice(len(POSITIONS), count, p=POSITION_SHARE)
+    return pd.DataFrame({
+        "athlete_id": np.arange(next_id, next_id + count),
+        "athlete_display_name": [f"{f} {l} {i}" for f, l, i in zip(first, last, range(next_id, next_id + count))],
+        "athlete_short_name": [f"{f[0]}. {l} {i}" for f, l, i in zip(first, last, range(next_id, next_id + count))],
+        "position": position,
+        "athlete_position_abbreviation": POSITIONS[position],
+        "athlete_jersey": rng.integers(0, 55, count).astype(float),
+        # Scoring volume and overall skill multipliers
+        "usage": rng.lognormal(0.0, 0.3, count),
+        "skill": rng.lognormal(0.0, 0.12, count),
+    })
+
+
+def _rosters(rng, rosters, n_teams, players_per_team, next_id, turnover):
+    # rosters: players x slots per team (slot < STARTERS starts); a share is replaced every season
+    if rosters is None:
+        return _new_players(rng, n_teams * players_per_team, next_id)
+    replaced = rng.random(len(rosters)) < turnover
+    fresh = _new_players(rng, int(replaced.sum()), next_id)
+    rosters = rosters.copy()
+    for column in fresh.columns:
+        rosters.loc[replaced, column] = fresh[column].to_numpy()
+    return rosters
+
+
+def _schedule(rng, n_teams, games_per_team, first_date, season_type, first_game_id):
+    # Every game day pairs up the teams at random (one sits out when the count is odd)
+    days = []
+    for day in range(games_per_team):
+        order = rng.permutation(n_teams)
+        pairs = order[: n_teams // 2 * 2].reshape(-1, 2)
+        days.append(np.column_stack([pairs, np.full(len(pairs), day)]))
+    games = np.concatenate(days)
+    dates = pd.Timestamp(first_date) + pd.to_timedelta(games[:, 2] * 2 + rng.integers(0, 2, len(games)), unit="D")
+    return pd.DataFrame({
+        "game_id": np.arange(first_game_id, first_game_id + len(games)),
+        "home": games[:, 0],
+        "away": games[:, 1],
+        "game_date": dates,
+        "season_type": season_type,
+    })
+
+
+def _box_scores(rng, games, rosters, season, players_per_team):
+    n_games = len(games)
+    # Rows: game x side (home, away) x roster slot
+    game_idx = np.repeat(np.arange(n_games), 2 * players_per_team)
+    side = np.tile(np.repeat([0, 1], players_per_team), n_games)
+    slot = np.tile(np.arange(players_per_team), 2 * n_games)
+    team = np.where(side == 0, games["home"].to_numpy()[game_idx], games["away"].to_numpy()[game_idx])
+    opponent = np.where(side == 0, games["away"].to_numpy()[game_idx], games["home"].to_numpy()[game_idx])
+    player = rosters.iloc[team * players_per_team + slot].reset_index(drop=True)
+    n = len(slot)
+
+    starter = slot < STARTERS
+    dnp = rng.random(n) < np.where(starter, 0.02, 0.18)
+    minutes = np.where(starter, rng.normal(29, 5, n), rng.normal(10, 5, n)).clip(1, 45).round()
+    scale = minutes / 36 * player["skill"].to_numpy()
+
+    rates = np.array([POSITION_RATES[p] for p in POSITIONS])[player["position"].to_numpy(dtype=int)]
+    fga = rng.poisson(12 * scale * player["usage"].to_numpy())
+    fg3a = rng.binomial(fga, rates[:, 4])
+    fg3m = rng.binomial(fg3a, 0.34)
+    fg2m = rng.binomial(fga - fg3a, 0.48)
+    fta = rng.poisson(3 * scale * player["usage"].to_numpy())
+    ftm = rng.binomial(fta, 0.8)
+    rebounds = rng.poisson(rates[:, 0] * scale)
+    oreb = rng.binomial(rebounds, 0.25)
+    points = 2 * fg2m + 3 * fg3m + ftm
+
+    df = pd.DataFrame({
+        "game_id": games["game_id"].to_numpy()[game_idx],
+        "season": season,
+        "season_type": games["season_type"].to_numpy()[game_idx],
+        "game_date": games["game_date"].to_numpy()[game_idx],
+        "athlete_id": player["athlete_id"].to_numpy(),
+        "athlete_display_name": player["athlete_display_name"].to_numpy(),
+        "minutes": minutes,
+        "field_goals_made": fg2m + fg3m,
+        "field_goals_attempted": fga,
+        "three_point_field_goals_made": fg3m,
+        "three_point_field_goals_attempted": fg3a,
+        "free_throws_made": ftm,
+        "free_throws_attempted": fta,
+        "offensive_rebounds": oreb,
+        "defensive_rebounds": rebounds - oreb,
+        "rebounds": rebounds,
+        "assists": rng.poisson(rates[:, 1] * scale),
+        "steals": rng.poisson(rates[:, 2] * scale),
+        "blocks": rng.poisson(rates[:, 3] * scale),
+        "turnovers": rng.poisson(2.0 * scale),
+        "fouls": rng.poisson(2.5 * minutes / 36),
+        "points": points,
+        "starter": starter,
+        "ejected": False,
+        "did_not_play": dnp,
+        "athlete_jersey": player["athlete_jersey"].to_numpy(),
+        "athlete_short_name": player["athlete_short_name"].to_numpy(),
+        "athlete_position_abbreviation": player["athlete_position_abbreviation"].to_numpy(),
+        "home_away": np.where(side == 0, "home", "away"),
+        "team": team,
+        "opponent": opponent,
+    })
+    stat_columns = ["minutes", "field_goals_made", "field_goals_attempted", "three_point_field_goals_made",
+                    "three_point_field_goals_attempted", "free_throws_made", "free_throws_attempted",
+                    "offensive_rebounds", "defensive_rebounds", "rebounds", "assists", "steals", "blocks",
+                    "turnovers", "fouls", "points"]
+    df[stat_columns] = df[stat_columns].astype(float)
+    df.loc[dnp, stat_columns] = np.nan
+
+    # Scores and margins come from the generated player rows
+    team_score = df.groupby(["game_id", "home_away"])["points"].sum()
+    df["team_score"] = team_score.reindex(pd.MultiIndex.from_frame(df[["game_id", "home_away"]])).to_numpy().astype(int)
+    other_side = np.where(side == 0, "away", "home")
+    df["opponent_team_score"] = team_score.reindex(pd.MultiIndex.from_arrays([df["game_id"], other_side])).to_numpy().astype(int)
+    tied = df["team_score"] == df["opponent_team_score"]
+    df.loc[tied & (df["home_away"] == "home"), "team_score"] += 1
+    df.loc[tied & (df["home_away"] == "away"), "opponent_team_score"] += 1
+    df["team_winner"] = df["team_score"] > df["opponent_team_score"]
+    margin = (df["team_score"] - df["opponent_team_score"]).to_numpy()
+    df["plus_minus"] = np.where(dnp, np.nan, (margin * minutes / 40 + rng.normal(0, 4, n)).round())
+    df["reason"] = np.where(dnp, "COACH'S DECISION", None)
+    df["active"] = ~dnp
+    return df
+
+
+def _finish(df, teams):
+    # Team/opponent descriptive columns, dates as in the CSV, column order as in the CSV
+    team_columns = teams.drop(columns=["team_id"]).columns
+    for prefix, key in [("team", "team"), ("opponent_team", "opponent")]:
+        info = teams.iloc[df[key].to_numpy()].reset_index(drop=True)
+        df[f"{prefix}_id"] = info["team_id"].to_numpy()
+        for column in team_columns:
+            target = column if prefix == "team" else column.replace("team_", "opponent_team_", 1)
+            if target in BOX_SCORE_COLUMNS:
+                df[target] = info[column].to_numpy()
+
+    df["athlete_position_name"] = df["athlete_position_abbreviation"].map(POSITION_NAMES)
+    df["athlete_headshot_href"] = ("https://a.espncdn.com/i/headshots/wnba/players/full/"
+                                   + df["athlete_id"].astype(str) + ".png")
+    df["game_date_time"] = df["game_date"].dt.strftime("%Y-%m-%d") + " 19:00:00"
+    df["game_date"] = df["game_date"].dt.strftime("%Y-%m-%d")
+    return df[BOX_SCORE_COLUMNS]
+
+
+def generate_box_scores(seasons=1, teams=13, players_per_team=12, games_per_team=40, playoffs=True,
+                        first_season=2025, turnover=0.2, seed=0):
+    # Most recent season first, like the wehoop export
+    rng = np.random.default_rng(seed)
+    team_table = _teams(teams)
+    rosters = None
+    next_id = 5000000
+    next_game_id = 500000000
+    frames = []
+
+    for season in range(first_season - seasons + 1, first_season + 1):
+        rosters = _rosters(rng, rosters, teams, players_per_team, next_id, turnover)
+        next_id = int(rosters["athlete_id"].max()) + 1
+
+        games = _schedule(rng, teams, games_per_team, f"{season}-{SEASON_START}", REGULAR_SEASON, next_game_id)
+        if playoffs and teams >= 4:
+            playoff_teams = min(8, teams // 2 * 2)
+            first_date = games["game_date"].max() + pd.Timedelta(days=4)
+            playoff = _schedule(rng, playoff_teams, 3, first_date, PLAYOFFS, next_game_id + len(games))
+            games = pd.concat([games, playoff], ignore_index=True)
+        next_game_id += len(games)
+
+        frames.append(_box_scores(rng, games, rosters, season, players_per_team))
+
+    df = pd.concat(frames, ignore_index=True)
+    df = _finish(df, team_table)
+    return df.sort_values(["game_date", "game_id"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic WNBA box scores in the wnbaboxscore.csv layout")
+    parser.add_argument("output")
+    parser.add_argument("--seasons", type=int, default=1)
+    parser.add_argument("--teams", type=int, default=13)
+    parser.add_argument("--players-per-team", type=int, default=12)
+    parser.add_argument("--games-per-team", type=int, default=40)
+    parser.add_argument("--no-playoffs", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = generate_box_scores(args.seasons, args.teams, args.players_per_team, args.games_per_team,
+                             playoffs=not args.no_playoffs, seed=args.seed)
+    df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df)} rows to {args.output} in {time.perf_counter() - start:.1f}s")
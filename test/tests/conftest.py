@@ -0,0 +1,109 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# The modules read WNBA_DATA_DIR when they are imported, so every test session
+# gets its own scratch store before any of them is.
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_DIR = os.path.dirname(TESTS_DIR)
+FIXTURE_DIR = os.path.join(MODULE_DIR, "fixtures")
+os.environ["WNBA_DATA_DIR"] = tempfile.mkdtemp(prefix="wnba-tests-")
+sys.path.insert(0, MODULE_DIR)
+
+TABLES = ["players", "games", "defense_games", "defense_totals"]
+
+
+def reset_caches():
+    # Every per-process cache, as in a fresh interpreter
+    import correlation
+    import defense
+    import gamelog_index
+    import matchups
+    import names
+    import probability
+    import rolling
+    import snapshots
+    import splits
+
+    with snapshots._lock:
+        for snapshot in snapshots._snapshots.values():
+            snapshot.close()
+        snapshots._snapshots.clear()
+    snapshots._pointer["entry"] = (None, None)
+    gamelog_index._cached["entry"] = (None, None)
+    rolling._cached["engine"] = None
+    for cache in (correlation._cached, defense._cache, matchups._cache, names._cached, probability._cache,
+                  splits._cached):
+        cache["version"] = None
+
+
+def clear_store():
+    # Empties the store directory and every cache built from it
+    reset_caches()
+    for entry in os.scandir(os.environ["WNBA_DATA_DIR"]):
+        if entry.is_dir():
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+
+
+def previous_season(rows):
+    # The rows replayed a season earlier, under other game ids
+    return rows.assign(
+        season=rows["season"] - 1,
+        game_id=rows["game_id"] + 1_000_000,
+        game_date=(pd.to_datetime(rows["game_date"]) - pd.DateOffset(years=1)).dt.strftime("%Y-%m-%d"),
+    )
+
+
+def read_state():
+    # What every way of loading the same rows must agree on: the box score
+    # frame, the game log index, the rolling summary and the database tables
+    from sqlalchemy import select
+
+    from boxscores import CATEGORICAL_COLUMNS, load_box_scores
+    from db import get_engine, metadata
+    from gamelog_index import get_index
+    from rolling import get_rolling
+
+    frame = load_box_scores().sort_values(["game_id", "athlete_id"]).reset_index(drop=True)
+    state = {
+        "frame": frame.astype({col: str for col in CATEGORICAL_COLUMNS}),
+        "index": get_index().to_frame(),
+        "rolling": get_rolling().summary(),
+    }
+    with get_engine().connect() as conn:
+        for name in TABLES:
+            table = metadata.tables[name]
+            keys = [c.name for c in table.primary_key.columns]
+            state[name] = pd.read_sql(select(table), conn).sort_values(keys).reset_index(drop=True)
+    return state
+
+
+def assert_same_state(state, expected):
+    assert list(state) == list(expected)
+    for name in expected:
+        pd.testing.assert_frame_equal(state[name], expected[name], check_exact=False, obj=name)
+
+
+@pytest.fixture
+def store():
+    # An empty store; yields the function that empties it again
+    clear_store()
+    yield clear_store
+    reset_caches()
+
+
+@pytest.fixture
+def fixture_rows():
+    # Every row of the fixture files, as the fixture source returns them
+    from ingest import FixtureSource
+    return FixtureSource(FIXTURE_DIR).fetch()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(os.environ["WNBA_DATA_DIR"], ignore_errors=True)
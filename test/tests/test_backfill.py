@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+import pytest
+
+from backfill import backfill, season_partitions
+from boxscores import load_box_scores, write_box_scores
+from conftest import assert_same_state, previous_season, read_state
+from ingest import DumpSource
+
+
+# An empty partition reaching the merge shows up as pandas' empty-entry concat warning
+@pytest.mark.filterwarnings("error::FutureWarning")
+def test_backfill_matches_serial_build(store, fixture_rows, tmp_path):
+    # Two seasons, the earlier one a copy of the fixture a year back, plus a
+    # preseason partition that cleaning empties
+    last_season = previous_season(fixture_rows)
+    preseason = fixture_rows.assign(season_type=1, game_id=fixture_rows["game_id"] + 2_000_000)
+    rows = pd.concat([last_season, preseason, fixture_rows], ignore_index=True)
+    dump = str(tmp_path / "dump.csv")
+    rows.to_csv(dump, index=False)
+
+    snapshot = backfill([2024, 2025], DumpSource(dump), workers=2)
+    assert snapshot.version
+    parallel = read_state()
+    assert parallel["frame"]["season"].value_counts().to_dict() == {2024: 492, 2025: 492}
+
+    store()
+    write_box_scores(pd.read_csv(dump))
+    assert_same_state(parallel, read_state())
+
+
+def test_dump_fetch_season(fixture_rows, tmp_path):
+    rows = pd.concat([previous_season(fixture_rows), fixture_rows], ignore_index=True)
+    csv_path = str(tmp_path / "dump.csv")
+    parquet_path = str(tmp_path / "dump.parquet")
+    rows.to_csv(csv_path, index=False)
+    # Small row groups, so most of them are skipped by their season statistics
+    rows.to_parquet(parquet_path, index=False, row_group_size=100)
+
+    for path in (csv_path, parquet_path):
+        for season in (2024, 2025):
+            fetched = DumpSource(path).fetch_season(season)
+            assert (fetched["season"] == season).all()
+            assert fetched["game_id"].tolist() == rows.loc[rows["season"] == season, "game_id"].tolist()
+
+
+def test_backfill_refetches_latest_season(store, fixture_rows, tmp_path):
+    # Partitions saved by an earlier run are reused, except the latest season's
+    rows = pd.concat([previous_season(fixture_rows), fixture_rows], ignore_index=True)
+    dump = str(tmp_path / "dump.csv")
+    rows[pd.to_datetime(rows["game_date"]) <= "2025-05-22"].to_csv(dump, index=False)
+    backfill([2024, 2025], DumpSource(dump), workers=2)
+    assert len(load_box_scores(seasons=[2025])) == 362
+    saved = {path: os.stat(path).st_mtime_ns for path in season_partitions(2024)}
+
+    rows.to_csv(dump, index=False)
+    backfill([2024, 2025], DumpSource(dump), workers=2)
+    assert len(load_box_scores(seasons=[2025])) == 492
+    assert {path: os.stat(path).st_mtime_ns for path in season_partitions(2024)} == saved
@@ -0,0 +1,61 @@
+import numpy as np
+
+from boxscores import load_box_scores, write_box_scores
+from correlation import MIN_CORRELATION_GAMES, PAIR_MEASURES, get_correlations
+
+STATS = ["points", "rebounds", "assists"]
+
+
+def merged_pair(df, leg_a, leg_b, latest_team):
+    # Brute force for one pair of legs: their games merged on game_id, kept
+    # when the players' teams in that game match their current relation
+    a, stat_a, line_a, side_a = leg_a
+    b, stat_b, line_b, side_b = leg_b
+    left = df.loc[df["athlete_id"] == a, ["game_id", "team_id", stat_a]].dropna()
+    right = df.loc[df["athlete_id"] == b, ["game_id", "team_id", stat_b]].dropna()
+    games = left.merge(right, on="game_id", suffixes=("_a", "_b"))
+    same_team = games["team_id_a"] == games["team_id_b"]
+    games = games[same_team if latest_team[a] == latest_team[b] else ~same_team]
+    x = games.iloc[:, 2].astype("float64")
+    y = games.iloc[:, 4].astype("float64")
+    hits_a = (x > line_a) if side_a == "over" else (x < line_a)
+    hits_b = (y > line_b) if side_b == "over" else (y < line_b)
+
+    n = len(games)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate_a = hits_a.sum() / n if n else np.nan
+        rate_b = hits_b.sum() / n if n else np.nan
+        joint = (hits_a & hits_b).sum() / n if n else np.nan
+        lift = joint / (rate_a * rate_b)
+    correlation = x.corr(y, method="pearson") if n >= MIN_CORRELATION_GAMES else np.nan
+    return {"games": n, "correlation": correlation, "hit_rate_a": rate_a, "hit_rate_b": rate_b,
+            "joint_hit_rate": joint, "lift": lift}
+
+
+def test_pairs_match_merged_game_logs(store, fixture_rows):
+    write_box_scores(fixture_rows)
+    df = load_box_scores().sort_values("game_date", kind="stable")
+    latest_team = df.groupby("athlete_id")["team_id"].last()
+
+    # The top scorers of both teams of the opening game, lined at their median
+    # so that legs hit and miss: teammates, opponents and the same player twice
+    teams = df.loc[df["game_id"] == df["game_id"].iloc[0], "team_id"].unique()
+    totals = df[df["team_id"].isin(teams)].groupby(["team_id", "athlete_id"], observed=True)["points"].sum()
+    scorers = totals.groupby(level="team_id", group_keys=False).nlargest(3).index.get_level_values("athlete_id")
+    picks = [(a, STATS[i % len(STATS)]) for i, a in enumerate(scorers)] + [(scorers[0], "rebounds")]
+    legs = []
+    for i, (athlete_id, stat) in enumerate(picks):
+        line = np.floor(df.loc[df["athlete_id"] == athlete_id, stat].astype("float64").median()) + 0.5
+        legs.append((athlete_id, stat, line, "over" if i % 2 else "under"))
+
+    table = get_correlations().pairs(legs)
+    assert len(table) == len(legs) * (len(legs) - 1) // 2
+    assert set(table["relation"]) == {"same player", "teammates", "opponents"}
+    for row in table.itertuples(index=False):
+        leg_a = (row.athlete_id_a, row.stat_a, row.line_a, row.over_under_a)
+        leg_b = (row.athlete_id_b, row.stat_b, row.line_b, row.over_under_b)
+        expected = merged_pair(df, leg_a, leg_b, latest_team)
+        actual = row._asdict()
+        for measure in PAIR_MEASURES[1:]:
+            np.testing.assert_allclose(actual[measure], expected[measure], equal_nan=True,
+                                       err_msg=f"{measure} of {leg_a} x {leg_b}")
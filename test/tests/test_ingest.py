@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+import boxscores
+import refresh
+from boxscores import append_box_scores, current_snapshot, load_box_scores, write_box_scores
+from conftest import FIXTURE_DIR, MODULE_DIR, assert_same_state, previous_season, read_state
+from gamelog_index import get_index
+from ingest import FixtureSource, run_ingest
+from rolling import get_rolling
+
+# The fixture holds the first 22 games of the 2025 season plus the All-Star
+# game, which cleaning drops. Stores are seeded from box_scores_01 (May 16-22)
+# and refreshed with box_scores_02 (May 23-24).
+LEAGUE_ROWS = 492
+LEAGUE_GAMES = 22
+SEEDED_THROUGH = "2025-05-22"
+ALL_STAR_TEAM_IDS = {131246, 131247}
+
+
+def seed(rows, through):
+    # Publishes the rows played on or before the given date and warms the caches
+    # an incremental refresh updates in place
+    write_box_scores(rows[pd.to_datetime(rows["game_date"]) <= through])
+    get_index()
+    get_rolling().summary()
+
+
+def test_full_ingest(store):
+    run_ingest(FixtureSource(FIXTURE_DIR), incremental=False)
+
+    df = load_box_scores()
+    assert len(df) == LEAGUE_ROWS
+    assert df["game_id"].nunique() == LEAGUE_GAMES
+    assert not df["team_id"].isin(ALL_STAR_TEAM_IDS).any()
+
+
+def test_incremental_matches_full(store, fixture_rows):
+    seed(fixture_rows, SEEDED_THROUGH)
+
+    # The fetch starts at the latest stored date, so May 22 comes back again
+    added = run_ingest(FixtureSource(FIXTURE_DIR))
+    assert added["game_id"].nunique() == 6
+    assert pd.to_datetime(added["game_date"]).min() == pd.Timestamp("2025-05-23")
+    incremental = read_state()
+
+    store()
+    write_box_scores(fixture_rows)
+    assert_same_state(incremental, read_state())
+
+
+def test_incremental_without_new_games(store, fixture_rows):
+    write_box_scores(fixture_rows)
+    version = current_snapshot().version
+
+    added = run_ingest(FixtureSource(FIXTURE_DIR))
+    assert added.empty
+    assert current_snapshot().version == version
+    assert len(load_box_scores()) == LEAGUE_ROWS
+
+
+def test_full_flag_replaces_store(store, fixture_rows):
+    write_box_scores(fixture_rows[pd.to_datetime(fixture_rows["game_date"]) <= "2025-05-16"])
+    version = current_snapshot().version
+
+    subprocess.run([sys.executable, "ingest.py", "--source", "fixture", "--path", FIXTURE_DIR, "--full"],
+                   cwd=MODULE_DIR, env=os.environ, check=True, capture_output=True)
+
+    assert current_snapshot().version != version
+    assert len(load_box_scores()) == LEAGUE_ROWS
+
+
+def test_refresh_after_outside_publish(store, fixture_rows):
+    # Rows appended by another writer after the caches were built: the next
+    # refresh must not merge its games into the stale index
+    seed(fixture_rows, SEEDED_THROUGH)
+    game_dates = pd.to_datetime(fixture_rows["game_date"])
+
+    append_box_scores(fixture_rows[game_dates == "2025-05-23"])
+    refresh.apply_new_games(fixture_rows[game_dates > "2025-05-23"])
+    incremental = read_state()
+
+    store()
+    write_box_scores(fixture_rows)
+    assert_same_state(incremental, read_state())
+
+
+def test_opening_day_store(store, fixture_rows):
+    # Before every team has faced two opponents the schedule cannot tell
+    # franchises apart, so no league game is dropped
+    game_dates = pd.to_datetime(fixture_rows["game_date"])
+    for through in ("2025-05-16", "2025-05-17"):
+        store()
+        opening = fixture_rows[game_dates <= through]
+        write_box_scores(opening)
+        assert len(load_box_scores()) == len(opening)
+
+
+def test_exhibition_without_override(store, fixture_rows, monkeypatch):
+    # The All-Star teams play no league schedule, so once the season before is
+    # stored they are dropped even when the override list does not name them
+    monkeypatch.setattr(boxscores, "EXHIBITION_TEAM_IDS", [])
+    league = fixture_rows[~fixture_rows["team_id"].isin(ALL_STAR_TEAM_IDS)]
+    seed(pd.concat([previous_season(league), fixture_rows], ignore_index=True), SEEDED_THROUGH)
+
+    added = refresh.apply_new_games(fixture_rows[pd.to_datetime(fixture_rows["game_date"]) > SEEDED_THROUGH])
+    assert not added["team_id"].isin(ALL_STAR_TEAM_IDS).any()
+    assert len(load_box_scores(seasons=[2025])) == LEAGUE_ROWS
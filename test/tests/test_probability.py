@@ -0,0 +1,53 @@
+import numpy as np
+
+from boxscores import data_version, load_box_scores, write_box_scores
+from conftest import reset_caches
+from gamelog_index import get_index
+from probability import _simulate, fit_players, prop_probabilities, sample_minutes
+
+
+def test_price_does_not_depend_on_the_slate(store, fixture_rows):
+    # A prop is priced the same alone, within a slate in any order and next to
+    # another stat of the same player, each from cold caches
+    write_box_scores(fixture_rows)
+    df = load_box_scores()
+    athlete_ids = df.groupby("athlete_id")["points"].sum().nlargest(8).index.tolist()
+    stats = ["points", "rebounds", "assists", "PTS+REB+AST"] * 2
+    lines = [18.5, 5.5, 3.5, 28.5, 15.5, 4.5, 2.5, 22.5]
+    sides = ["over", "under"] * 4
+
+    slate = prop_probabilities(athlete_ids, stats, lines, sides)
+    reset_caches()
+    reverse = prop_probabilities(athlete_ids[::-1], stats[::-1], lines[::-1], sides[::-1])
+    np.testing.assert_array_equal(slate["prob"], reverse["prob"][::-1])
+    assert np.isfinite(slate["prob"]).all()
+
+    for i in (0, 5):
+        reset_caches()
+        alone = prop_probabilities(athlete_ids[i:i + 1], stats[i:i + 1], lines[i:i + 1], sides[i:i + 1])
+        assert alone["prob"][0] == slate["prob"][i]
+        reset_caches()
+        paired = prop_probabilities([athlete_ids[i]] * 2, ["rebounds", stats[i]], [4.5, lines[i]], ["over", sides[i]])
+        assert paired["prob"][1] == slate["prob"][i]
+
+
+def test_distribution_matches_gamma_poisson_draws(store, fixture_rows):
+    # Each minutes draw's exact count distribution, against drawing the gamma
+    # and Poisson noise for every simulation
+    write_box_scores(fixture_rows)
+    index = get_index()
+    athlete_ids = load_box_scores().groupby("athlete_id")["points"].sum().nlargest(4).index.tolist()
+    minutes, counts = sample_minutes(index, athlete_ids, data_version())
+    rng = np.random.default_rng(0)
+    for stat in ("points", "PTS+REB+AST"):
+        keys = [(a, stat, None, None) for a in athlete_ids]
+        rate, dispersion = fit_players(index, stat, index.positions(athlete_ids))
+        assert (dispersion > 1).any()
+        for i, distribution in enumerate(_simulate(index, stat, keys, minutes, counts)):
+            mean = np.repeat(rate[i] * minutes[i], counts[i])
+            extra = dispersion[i] - 1.0
+            intensity = rng.gamma(mean / extra, extra, size=(20, len(mean))) if extra > 0 else mean
+            drawn = np.cumsum(np.bincount(rng.poisson(intensity).ravel(), minlength=len(distribution)))
+            drawn = drawn / drawn[-1]
+            assert distribution[-1] == 1.0
+            np.testing.assert_allclose(distribution, drawn[:len(distribution)], atol=0.01)